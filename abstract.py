@@ -0,0 +1,380 @@
+from abc import ABC, abstractmethod
+
+from functions import *
+from constants import *
+from cache import *
+
+# Abstract values only depend on the operation and on the domains (including
+# their inputs), so they are cached by both.
+analysisCache = Cache("abstract values")
+
+
+# Abstract interpretation of integer functions f(x, y).
+#
+# A domain describes a property of the values that an expression can take
+# (e.g. the ranges containing them, or their residues) as an abstract value.
+# analyze computes the abstract values of f(x, y) for a product of domains
+# in a single bottom-up pass over the tree: each domain gives the abstract
+# values of the leaves, and combines the abstract values of the children of
+# each operator into the abstract value of the operator.
+#
+# Two domains are provided: IntervalDomain (the ranges of a value, used by
+# the closure check) and ResidueDomain (its residues modulo constants, used
+# by inferModVals). Signs and parities are not separate domains, since the
+# signs of a value follow from its ranges and its parity is its residue
+# modulo 2. The closure check itself checks residues pair by pair with an
+# early exit (see checkClosureWitness) rather than in the same pass as the
+# ranges.
+#
+# New domains are added by subclassing Domain and overriding its methods.
+# Domain is abstract: key and top have no meaningful default, so every
+# domain must override them.
+class Domain(ABC):
+    # Returns a hashable description of the domain and of its inputs, which
+    # is part of the keys of analysisCache.
+    @abstractmethod
+    def key(self):
+        pass
+
+    # Returns the abstract value of the variable x or y.
+    def variable(self, node):
+        return self.top()
+
+    # Returns the abstract value of the number `value`.
+    def num(self, value):
+        return self.top()
+
+    # Returns the abstract value of -e, where e has the abstract value `child`.
+    def minus(self, child):
+        return self.top()
+
+    # Returns the abstract value of the BinaryMath `node`, where its left and
+    # right children have the abstract values `left` and `right`.
+    def binary(self, node, left, right):
+        return self.top()
+
+    # Returns the abstract value that describes any value, or raises a
+    # LazyError if the domain cannot describe every value.
+    @abstractmethod
+    def top(self):
+        pass
+
+
+# Returns the list of the abstract values of the integer function `f(x, y)`,
+# one for each domain in the list `domains`.
+#
+# Every node is visited once, and subtrees shared between nodes (such as the
+# variables) are only analyzed once. Constant subtrees are folded into
+# numbers before being handed to the domains, so that every domain is exact
+# on them.
+def analyze(f, domains):
+    cacheKey = (f.key(), tuple(d.key() for d in domains))
+    cachedResult, cached = analysisCache.get(cacheKey)
+    if cached:
+        return list(cachedResult)
+
+    values = {}
+    consts = {}
+    # Iterative post-order traversal: each stack entry is a node and whether
+    # its children have already been analyzed.
+    stack = [(f, False)]
+    while len(stack) > 0:
+        node, childrenDone = stack.pop()
+        if id(node) in values:
+            continue
+        if isinstance(node, BinaryMath):
+            if not childrenDone:
+                stack.append((node, True))
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+                continue
+            l = id(node.left)
+            r = id(node.right)
+            if l in consts and r in consts:
+                consts[id(node)] = node.func(consts[l], consts[r])
+                values[id(node)] = [d.num(consts[id(node)]) for d in domains]
+            else:
+                values[id(node)] = [d.binary(node, values[l][i], values[r][i])
+                                    for i, d in enumerate(domains)]
+        elif isinstance(node, Minus):
+            if not childrenDone:
+                stack.append((node, True))
+                stack.append((node.child, False))
+                continue
+            c = id(node.child)
+            if c in consts:
+                consts[id(node)] = -consts[c]
+                values[id(node)] = [d.num(consts[id(node)]) for d in domains]
+            else:
+                values[id(node)] = [d.minus(values[c][i])
+                                    for i, d in enumerate(domains)]
+        elif isinstance(node, Num):
+            consts[id(node)] = node.value
+            values[id(node)] = [d.num(node.value) for d in domains]
+        elif isinstance(node, X) or isinstance(node, Y):
+            values[id(node)] = [d.variable(node) for d in domains]
+        else:
+            values[id(node)] = [d.top() for d in domains]
+
+    result = values[id(f)]
+    analysisCache.put(cacheKey, tuple(result))
+    return list(result)
+
+
+###### Domains ######
+
+
+# The ranges [[b_1, t_1], ..., [b_n, t_n]] that may contain a value, given
+# the ranges that may contain x and y. The ranges are merged at every step
+# (see mergeAllowedRanges), so that the number of ranges stays bounded
+# however deep the function is.
+class IntervalDomain(Domain):
+    def __init__(self, allowedRanges):
+        self.allowedRanges = mergeAllowedRanges(allowedRanges)
+
+    def key(self):
+        return ("interval", tuple(self.allowedRanges))
+
+    def variable(self, node):
+        return self.allowedRanges
+
+    def num(self, value):
+        return [(value, value)]
+
+    def minus(self, child):
+        return mergeAllowedRanges([(-c[1], -c[0]) for c in child])
+
+    def binary(self, node, left, right):
+        allowed = []
+        if isinstance(node, Add):
+            for l, r in rangePairs(left, right):
+                allowed.append((l[0] + r[0], l[1] + r[1]))
+        elif isinstance(node, Sub):
+            for l in left:
+                for r in right:
+                    allowed.append((l[0] - r[1], l[1] - r[0]))
+        elif isinstance(node, Mult):
+            for l, r in rangePairs(left, right):
+                vals = [l[0] * r[0], l[0] * r[1], l[1] * r[0], l[1] * r[1]]
+                allowed.append((min(vals), max(vals)))
+        elif isinstance(node, Div):
+            # Division by zero is undefined, so the divisor ranges are split
+            # into their negative and positive parts, on which l / r is
+            # monotonic in both l and r.
+            for l in left:
+                for r in splitAtZero(right):
+                    lows = []
+                    highs = []
+                    for n in l:
+                        for d in r:
+                            lows.append(divideBounds(n, d, False))
+                            highs.append(divideBounds(n, d, True))
+                    allowed.append((min(lows), max(highs)))
+        elif isinstance(node, Mod):
+            # For a positive modulus n, e % n is in [0, n - 1] (and is e
+            # itself if e is already in that range). For a negative modulus
+            # n, e % n is in [n + 1, 0].
+            for r in right:
+                if r[0] > 0:
+                    for l in left:
+                        if l[0] >= 0 and l[1] <= r[0] - 1:
+                            allowed.append(l)
+                        else:
+                            allowed.append((0, r[1] - 1))
+                elif r[1] < 0:
+                    for l in left:
+                        if l[1] <= 0 and l[0] >= r[1] + 1:
+                            allowed.append(l)
+                        else:
+                            allowed.append((r[0] + 1, 0))
+                else:
+                    allowed.append((r[0] + 1, r[1] - 1))
+        else:
+            return self.top()
+        return mergeAllowedRanges(allowed)
+
+    def top(self):
+        return [(BOTTOM, TOP)]
+
+
+# The values of an expression for every pair (i, j) of residues that x % n
+# and y % n can take, for each modulus n, given a map n => [v_1, ..., v_k]
+# of those residues. An abstract value maps each modulus n to the tuple of
+# the values of the expression for x = i and y = j, for each pair (i, j) in
+# self.pairs[n], so that the residues of f(x, y) modulo n are these values
+# modulo n.
+#
+# If `symmetric` is true, f(x, y) must be equal to f(y, x) (see
+# symmetry.py), and only one of the pairs (i, j) and (j, i) is enumerated.
+class ResidueDomain(Domain):
+    def __init__(self, modVals, symmetric=False):
+        self.modVals = modVals
+        self.symmetric = symmetric
+        self.pairs = {}
+        for num, vals in modVals.items():
+            if symmetric:
+                self.pairs[num] = [(vals[a], vals[b]) for a in range(len(vals))
+                                   for b in range(a, len(vals))]
+            else:
+                self.pairs[num] = [(i, j) for i in vals for j in vals]
+
+    def key(self):
+        return ("residue", self.symmetric, tuple((num, tuple(vals))
+                                                 for num, vals in self.modVals.items()))
+
+    def variable(self, node):
+        position = 0 if isinstance(node, X) else 1
+        return {num: tuple(pair[position] for pair in pairs)
+                for num, pairs in self.pairs.items()}
+
+    def num(self, value):
+        if int(value) != value:
+            return self.top()
+        return {num: (value,) * len(pairs)
+                for num, pairs in self.pairs.items()}
+
+    def minus(self, child):
+        return {num: tuple(-v for v in vals) for num, vals in child.items()}
+
+    def binary(self, node, left, right):
+        if not carriesResidues(node, self.pairs):
+            return self.top()
+        return {num: tuple(node.func(l, r) for l, r in zip(left[num], right[num]))
+                for num in left}
+
+    def top(self):
+        if len(self.pairs) == 0:
+            return {}
+        raise LazyError("!!! Failed to evaluate residues of an expression for moduli ",
+                        list(self.modVals.keys()), " !!!")
+
+    # Returns the map n => [v_1, ..., v_k] of the numbers that the
+    # expression with the abstract value `value` can be equal to modulo n.
+    def residues(self, value):
+        return {num: list(set(v % num for v in vals))
+                for num, vals in value.items()}
+
+
+# Returns true if the residues modulo each n in `moduli` of the BinaryMath
+# `node` only depend on the residues of its children. Sums, differences and
+# products of integers do, and so does e % m if m is a nonzero multiple of
+# n. Other divisions and moduli do not (for example, 0 and 2 are even but
+# (0 + 2) / 2 is not), so their residues are unknown.
+def carriesResidues(node, moduli):
+    if isinstance(node, Add) or isinstance(node, Sub) or isinstance(node, Mult):
+        return True
+    elif isinstance(node, Mod):
+        m, mConst = node.right.eval()
+        return mConst and m != 0 and int(m) == m and \
+            all(int(m) % num == 0 for num in moduli)
+    return False
+
+
+# Returns true if the residues modulo each n in `moduli` of the integer
+# function `f(x, y)` only depend on the residues of x and y, i.e. if f is
+# made of x, y, integers, and operators for which carriesResidues is true.
+def carriesAllResidues(f, moduli):
+    stack = [f]
+    while len(stack) > 0:
+        node = stack.pop()
+        if isinstance(node, BinaryMath):
+            if not carriesResidues(node, moduli):
+                return False
+            stack.append(node.left)
+            stack.append(node.right)
+        elif isinstance(node, Minus):
+            stack.append(node.child)
+        elif isinstance(node, Num):
+            if int(node.value) != node.value:
+                return False
+        elif not isinstance(node, X) and not isinstance(node, Y):
+            return False
+    return True
+
+
+# Returns true if every subexpression of the integer function `func` is in
+# [INT64_MIN, INT64_MAX] when x and y are in [lo, hi] (see IntervalDomain).
+def fitsInt64(func, lo, hi):
+    stack = [func]
+    while len(stack) > 0:
+        node = stack.pop()
+        for bottom, top in analyze(node, [IntervalDomain([(lo, hi)])])[0]:
+            if bottom < INT64_MIN or top > INT64_MAX:
+                return False
+        if isinstance(node, BinaryMath):
+            stack.append(node.left)
+            stack.append(node.right)
+        elif isinstance(node, Minus):
+            stack.append(node.child)
+    return True
+
+
+###### Range helpers ######
+
+
+# Returns the pairs (l, r) of a range l of `left` and a range r of `right`
+# whose sums or products must be computed. If both lists are the same, the
+# pairs (l, r) and (r, l) give the same sum and product, so only one of
+# them is returned.
+def rangePairs(left, right):
+    if left == right:
+        return [(left[a], left[b]) for a in range(len(left))
+                for b in range(a, len(left))]
+    return [(l, r) for l in left for r in right]
+
+
+# Given a list of ranges, mergeAllowedRanges returns a sorted list of
+# disjoint ranges that contain every number of the given ranges:
+# 1. The union of the ranges is computed (see unionRanges), and:
+# 2. While there are more than MAX_RANGES ranges, the two ranges separated
+#    by the smallest gap are merged (which only adds numbers).
+def mergeAllowedRanges(ranges):
+    merged = unionRanges(ranges)
+    while len(merged) > MAX_RANGES:
+        gaps = [merged[i + 1][0] - merged[i][1]
+                for i in range(len(merged) - 1)]
+        i = gaps.index(min(gaps))
+        merged[i:i + 2] = [(merged[i][0], merged[i + 1][1])]
+    return merged
+
+
+# Given a list of ranges, unionRanges returns the sorted list of disjoint
+# ranges that contain exactly the numbers of the given ranges: empty ranges
+# are dropped, and overlapping or adjacent ranges are merged.
+def unionRanges(ranges):
+    merged = []
+    for r in sorted([r for r in ranges if r[0] <= r[1]]):
+        if len(merged) > 0 and r[0] <= merged[-1][1] + 1:
+            if r[1] > merged[-1][1]:
+                merged[-1] = (merged[-1][0], r[1])
+        else:
+            merged.append(r)
+    return merged
+
+
+# Given a list of ranges of divisors, splitAtZero returns the list of
+# their negative and positive parts.
+def splitAtZero(ranges):
+    parts = []
+    for r in ranges:
+        if r[0] <= -1:
+            parts.append((r[0], min(r[1], -1)))
+        if r[1] >= 1:
+            parts.append((max(r[0], 1), r[1]))
+    return parts
+
+
+# Returns the bound n / d rounded up if `roundUp` is true or down otherwise,
+# where n and d are ints or infinities and d is nonzero. Finite bounds are
+# divided exactly, without going through floating point.
+def divideBounds(n, d, roundUp):
+    if isInfinite(n):
+        if isInfinite(d):
+            return Infinity(n.sign * d.sign)
+        return n / d
+    if isInfinite(d):
+        return 0
+    if roundUp:
+        return -((-n) // d)
+    return n // d
+
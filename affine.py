@@ -0,0 +1,70 @@
+from closure import *
+from solver import *
+
+
+# Closed-form checks for affine operations f(x, y) = αx + βy + γ, where α,
+# β, and γ are integers.
+#
+# For such operations:
+# 1. f is associative if and only if α² == α, β² == β, and αγ == βγ, since
+#    f(f(a, b), c) == α²a + αβb + βc + αγ + γ and
+#    f(a, f(b, c)) == αa + αβb + β²c + βγ + γ, and:
+# 2. If α == β == 1, the identity is -γ and the inverse of x is -x - 2γ,
+#    and:
+# 3. f is closed if it maps the residues and ranges of the condition into
+#    themselves, which only requires arithmetic on the residues and bounds.
+
+
+# If the integer function `f(x, y)` is affine, getAffine returns
+# ((α, β, γ), True). Otherwise, it returns ((0, 0, 0), False).
+def getAffine(f):
+    poly, isPolynomial = toPolynomial(f)
+    if not isPolynomial:
+        return (0, 0, 0), False
+    for monomial in poly:
+        if monomial not in [(), ("x",), ("y",)]:
+            return (0, 0, 0), False
+    return (poly.get(("x",), 0), poly.get(("y",), 0), poly.get((), 0)), True
+
+
+# Returns true if and only if the affine operation αx + βy + γ is
+# associative.
+def isAffineAssociative(alpha, beta, gamma):
+    return alpha * alpha == alpha and beta * beta == beta and alpha * gamma == beta * gamma
+
+
+# Given a boolean expression `cond(x)`, returns true if and only if the
+# affine function αx + βy + γ maps the residues and the ranges of the
+# members of `cond` to residues and ranges of members of `cond`, as
+# checkClosure does for any function.
+def checkAffineClosure(cond, alpha, beta, gamma):
+    c = cond.simplify()
+    modVals = getModVals(c)
+    for num, vals in modVals.items():
+        xs = set((alpha * i) % num for i in vals)
+        ys = set((beta * j) % num for j in vals)
+        for i in xs:
+            for j in ys:
+                if (i + j + gamma) % num not in vals:
+                    return False
+
+    ranges, bottoms, tops = getRanges(c)
+    allowed = []
+    for l in scaleRanges(ranges, alpha):
+        for r in scaleRanges(ranges, beta):
+            allowed.append((l[0] + r[0] + gamma, l[1] + r[1] + gamma))
+    return checkRanges(getForbiddenRanges(bottoms, tops), mergeAllowedRanges(allowed))
+
+
+# Returns the ranges that contain n * factor for each n in the given ranges.
+def scaleRanges(ranges, factor):
+    scaled = []
+    for r in ranges:
+        ends = [r[0] * factor, r[1] * factor]
+        scaled.append((min(ends), max(ends)))
+    return mergeAllowedRanges(scaled)
+
+
+# Returns the inverse -x - 2γ of the affine operation x + y + γ.
+def affineInverse(gamma):
+    return fromPolynomial(makePolynomial({("x",): -1, (): -2 * gamma}))
@@ -1,9 +1,48 @@
+import random
+
 from treetransform import *
+from cache import *
+from periodic import *
+from symmetry import *
+
+# Associativity only depends on the operation, so results are cached by
+# the key of the operation.
+assocCache = Cache("associativity")
+
 
+# Given an integer function f(x, y), checkAssoc returns true if f can be
+# shown to be associative, i.e. f(f(a, b), c) == f(a, f(b, c)) (see
+# decideAssoc). It returns false if f is not associative, or if this
+# cannot be decided.
+def checkAssoc(func, periodLimit=None):
+    assoc, decided = decideAssoc(func, periodLimit)
+    return assoc
 
-# Given an integer function f(x, y), checkAssoc returns true if and only if
-# f(f(a, b), c) == f(a, f(b, c)).
-def checkAssoc(func):
+
+# Given an integer function f(x, y), decideAssoc returns (assoc, True),
+# where assoc is true if and only if f(f(a, b), c) == f(a, f(b, c)), or
+# (False, False) if this cannot be decided.
+#
+# Operations containing % by constants are checked on residues (see
+# periodic.py); other operations are checked by simplifying both sides.
+# If the residue check is skipped (because the period of f is larger than
+# `periodLimit`, which defaults to PERIODIC_ASSOC_LIMIT, or NumPy is not
+# available), simplification can only prove associativity: for example,
+# (x + y) % 1000 is associative, but the simplifier cannot show it. Then
+# f is evaluated on sampled triples (see falsifyAssoc), and if none of
+# them is a counterexample, associativity is undecided.
+def decideAssoc(func, periodLimit=None):
+    result, cached = assocCache.get(func.key())
+    if cached:
+        return result
+    (alpha, beta, period), isPeriodic = getPeriodicStructure(func)
+    skipped = False
+    if isPeriodic and period > 1:
+        assoc, checked = checkPeriodicAssoc(func, alpha, beta, period,
+                                            isCommutative(func), periodLimit)
+        if checked:
+            return assocCache.put(func.key(), (assoc, True))
+        skipped = True
     left = leftAssoc(func)
     right = rightAssoc(func)
     l = left.simplify()
@@ -14,7 +53,29 @@ def checkAssoc(func):
         sign = "is greater than"
     elif cmp == 1:
         sign = "is less than"
-    return cmp == 0
+    if cmp != 0 and skipped:
+        if falsifyAssoc(func, period):
+            return assocCache.put(func.key(), (False, True))
+        return assocCache.put(func.key(), (False, False))
+    return assocCache.put(func.key(), (cmp == 0, True))
+
+
+# Returns true if f(f(a, b), c) != f(a, f(b, c)) for one of ASSOC_SAMPLES
+# triples (a, b, c) chosen at random (with the seed SEARCH_SEED) in
+# [-4L, 4L], where L is the period of the integer function `f(x, y)`.
+def falsifyAssoc(func, period):
+    from closure import getCompiledOperation
+    op = getCompiledOperation(func)
+    rng = random.Random(SEARCH_SEED)
+    for sample in range(ASSOC_SAMPLES):
+        checkpoint()
+        a, b, c = [rng.randint(-4 * period, 4 * period) for i in range(3)]
+        try:
+            if op(op(a, b), c) != op(a, op(b, c)):
+                return True
+        except ZeroDivisionError:
+            continue
+    return False
 
 
 # Replace x with the given xExpr (e.g. replace x with f(a, b))
@@ -0,0 +1,91 @@
+# Extended-integer bounds of ranges of integers.
+#
+# A bound is either a Python int or one of the two infinities TOP and
+# BOTTOM (see constants.py). Infinities compare with ints and support the
+# arithmetic needed by range inference in constant time: they absorb
+# finite values (TOP + n == TOP), follow the usual sign rules for
+# multiplication and division, and, as usual in interval arithmetic,
+# 0 * TOP == 0 and n / TOP == 0.
+class Infinity:
+    __slots__ = ('sign',)
+
+    def __init__(self, sign):
+        self.sign = sign
+
+    def __str__(self):
+        if self.sign > 0:
+            return "inf"
+        return "-inf"
+
+    def __repr__(self):
+        return str(self)
+
+    def __hash__(self):
+        return hash(("Infinity", self.sign))
+
+    def __eq__(self, other):
+        return isinstance(other, Infinity) and other.sign == self.sign
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        return self.sign < 0 and not self.__eq__(other)
+
+    def __le__(self, other):
+        return self.sign < 0 or self.__eq__(other)
+
+    def __gt__(self, other):
+        return self.sign > 0 and not self.__eq__(other)
+
+    def __ge__(self, other):
+        return self.sign > 0 or self.__eq__(other)
+
+    def __neg__(self):
+        return Infinity(-self.sign)
+
+    def __add__(self, other):
+        if isinstance(other, Infinity) and other.sign != self.sign:
+            raise ValueError("!!! Cannot add " + str(self) +
+                             " and " + str(other) + " !!!")
+        return self
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        return self.__add__(-other)
+
+    def __rsub__(self, other):
+        return (-self).__add__(other)
+
+    def __mul__(self, other):
+        s = sign(other)
+        if s == 0:
+            return 0
+        return Infinity(self.sign * s)
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        return self.__mul__(sign(other))
+
+    def __rtruediv__(self, other):
+        return 0
+
+
+# Returns -1, 0, or 1 according to the sign of the bound n.
+def sign(n):
+    if isinstance(n, Infinity):
+        return n.sign
+    if n > 0:
+        return 1
+    if n < 0:
+        return -1
+    return 0
+
+
+# Returns true if the bound n is TOP or BOTTOM.
+def isInfinite(n):
+    return isinstance(n, Infinity)
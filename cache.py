@@ -0,0 +1,65 @@
+import threading
+from collections import OrderedDict
+
+from constants import *
+
+# Caches of intermediate results of the group axiom checks.
+# Each cache is keyed by the parts of a group that the cached result depends
+# on (e.g. associativity only depends on the operation), so that checking
+# many groups that share an operation only pays for the shared work once.
+#
+# Each cache keeps at most CACHE_SIZE entries, evicting the least recently
+# used ones, and batch runners empty all caches between batches (see
+# clearCaches), so that long runs do not keep every result in memory.
+allCaches = []
+
+
+# A memo table that maps hashable keys to previously computed results,
+# holding at most `maxSize` entries (CACHE_SIZE by default). Caches are
+# shared by the checks running on a thread pool, so they are locked.
+class Cache:
+    def __init__(self, name, maxSize=None):
+        self.name = name
+        self.maxSize = maxSize if maxSize is not None else CACHE_SIZE
+        self.table = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        allCaches.append(self)
+
+    def __str__(self):
+        return self.name + ": " + str(len(self.table)) + " entries, " + \
+            str(self.hits) + " hits, " + str(self.misses) + " misses"
+
+    # If a result has been stored for `key`, get returns (result, True).
+    # Otherwise, it returns (None, False).
+    def get(self, key):
+        with self.lock:
+            if key in self.table:
+                self.hits += 1
+                self.table.move_to_end(key)
+                return self.table[key], True
+            self.misses += 1
+            return None, False
+
+    # Stores `value` as the result for `key` and returns it, evicting the
+    # least recently used entry if the cache is full.
+    def put(self, key, value):
+        with self.lock:
+            self.table[key] = value
+            self.table.move_to_end(key)
+            if len(self.table) > self.maxSize:
+                self.table.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.table = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+
+
+# Empties every cache.
+def clearCaches():
+    for cache in allCaches:
+        cache.clear()
@@ -1,43 +1,183 @@
+from math import ceil, floor
+
 from conditions import *
 from treetransform import *
 from constants import *
+from cache import *
+from abstract import *
+from symmetry import *
+from periodic import *
+
+
+operationCache = Cache("compiled operations")
 
 
 # Given a boolean expression `cond(x)` and an integer function `f(x, y)`,
 # checkClosure returns true if and only if `cond(f(x, y))` is true, i.e.
 # that if x and y both meet the conditions in `cond`, that `f(x, y)` also
-# meets the conditions in `cond`.
+# meets the conditions in `cond` (or None if this cannot be decided, see
+# checkClosureWitness).
 #
 # The two kinds of conditions that are specifically checked are:
 # 1. The sets of possible values that x % n can take, for 0 <= n < x, and:
 # 2. The ranges [[b_1, t_1], [b_2, t_2], ..., [b_n, t_n]] that may contain x.
 def checkClosure(cond, func):
+    closed, witness = checkClosureWitness(cond, func)
+    return closed
+
+
+# Like checkClosure, but returns (closed, witness), where witness is None
+# if closed is true, and otherwise either a counterexample (x, y, f(x, y))
+# such that x and y are members and f(x, y) is not, or None if no
+# counterexample was found among the candidates that were tried. closed is
+# None if closure cannot be decided (see below).
+#
+# The residue pairs (i, j) of each modulus n are evaluated one at a time
+# (only the pairs with i <= j if f is commutative, see symmetry.py), and
+# the check stops at the first pair such that f(i, j) % n is not one of
+# the target mod vals, so most operations that are not closed are rejected
+# after a few evaluations. The residues modulo n of x and y are enough if
+# f is made of operators that carry residues (see carriesAllResidues).
+# Otherwise, if f is quasi-affine with period L (see periodic.py), f(x, y)
+# % n only depends on x and y modulo M = lcm(n, L), so the pairs of
+# residues modulo M that are allowed modulo n are evaluated instead. For
+# other operations (e.g. with divisions), the residues of f are unknown:
+# closure is refuted if the ranges do not fit or a counterexample is found
+# among the members, and is undecided otherwise.
+#
+# For this reason, the residues and the ranges of f are not inferred in a
+# single pass of analyze: the ranges are only inferred once the residues
+# have passed, so operations that fail the residue check skip the interval
+# analysis entirely.
+def checkClosureWitness(cond, func):
     c = cond.simplify()
     f = func.simplify()
 
     xyModVals = getModVals(c)
-    fModVals = inferModVals(f, xyModVals)
-
-    # For each key i in the target mod vals, the inferred mod vals for i must
-    # be a subset of the target mod vals.
-    # For example, if the condition requires that x % i be equal to 0 or 1,
-    # then the function must not allow x % i to be anything other than 0 or 1.
-    if not checkMod(xyModVals, fModVals):
-        return False
+    ranges, bottoms, tops = getRanges(c)
+
+    residuesKnown = True
+    if len(xyModVals) > 0:
+        periods, residuesKnown = getResiduePeriods(f, xyModVals)
+    if len(xyModVals) > 0 and residuesKnown:
+        op = getCompiledOperation(f)
+        commutative = isCommutative(f)
+        for num, vals in xyModVals.items():
+            target = set(vals)
+            period = periods[num]
+            reps = [r for r in range(period) if r % num in target]
+            for a in range(len(reps)):
+                checkpoint()
+                for b in range(a if commutative else 0, len(reps)):
+                    if op(reps[a], reps[b]) % num not in target:
+                        return False, findResidueWitness(c, op, ranges, period, reps[a], reps[b])
 
-    ors = c.flatten()
-    ranges = []
-    bottoms = []
-    tops = []
-    for elt in ors:
-        bottom = getBottom(elt)
-        top = getTop(elt)
-        ranges.append((bottom, top))
-        bottoms.append(bottom)
-        tops.append(top)
     badCond = getForbiddenRanges(bottoms, tops)
     allowedFunc = inferAllowedRanges(f, ranges)
-    return checkRanges(badCond, allowedFunc)
+    if not checkRanges(badCond, allowedFunc):
+        return False, findRangeWitness(c, f, ranges)
+    if not residuesKnown:
+        witness = findRangeWitness(c, f, ranges)
+        if witness is not None:
+            return False, witness
+        return None, None
+    return True, None
+
+
+# Given an integer function `f(x, y)` and the map of mod values of a
+# condition, returns ({n: M}, True), where f(x, y) % n only depends on
+# x % M and y % M for each modulus n, or ({}, False) if there is no such M
+# (or if it is larger than RESIDUE_LIFT_LIMIT).
+def getResiduePeriods(f, modVals):
+    if carriesAllResidues(f, modVals):
+        return {num: num for num in modVals}, True
+    (alpha, beta, period), isPeriodic = getPeriodicStructure(f)
+    if not isPeriodic or int(alpha) != alpha or int(beta) != beta:
+        return {}, False
+    periods = {num: lcm(num, period) for num in modVals}
+    if max(periods.values()) > RESIDUE_LIFT_LIMIT:
+        return {}, False
+    return periods, True
+
+
+# Returns the Python function (x, y) -> f(x, y) of the integer function
+# `f(x, y)` (see membership.compileOperation).
+def getCompiledOperation(f):
+    key = f.key()
+    op, exists = operationCache.get(key)
+    if exists:
+        return op
+    from membership import compileOperation
+    return operationCache.put(key, compileOperation(f))
+
+
+# Returns a counterexample (x, y, f(x, y)) to the closure of `cond(x)`
+# under the compiled operation `op`, with x % num == i and y % num == j,
+# or None if there is none among the candidates that are tried (or if the
+# members of `cond` cannot be enumerated).
+def findResidueWitness(cond, op, ranges, num, i, j):
+    try:
+        xs = list(residueMembers(cond, ranges, num, i))
+        ys = xs if i == j else list(residueMembers(cond, ranges, num, j))
+        return findWitness(cond, op, xs, ys)
+    except LazyError:
+        return None
+
+
+# Returns a counterexample (x, y, f(x, y)) to the closure of `cond(x)`
+# under the integer function `f(x, y)`, with x and y among the members that
+# are closest to the bounds of the ranges of `cond`, or None if there is
+# none among them (or if f cannot be compiled, or the members of `cond`
+# cannot be enumerated).
+def findRangeWitness(cond, f, ranges):
+    try:
+        op = getCompiledOperation(f)
+        candidates = list(residueMembers(cond, ranges, 1, 0))
+        return findWitness(cond, op, candidates, candidates)
+    except LazyError:
+        return None
+
+
+# Returns (x, y, op(x, y)) for the first x in xs and y in ys such that
+# op(x, y) is not a member of `cond`, or None if there are none.
+def findWitness(cond, op, xs, ys):
+    for x in xs:
+        checkpoint()
+        for y in ys:
+            try:
+                value = op(x, y)
+            except ZeroDivisionError:
+                continue
+            if int(value) == value and not cond.contains(int(value)):
+                return x, y, int(value)
+    return None
+
+
+# Yields members x of `cond` with x % num == r, among the WITNESS_LIMIT
+# candidates of that residue class closest to each finite bound of the
+# given ranges (or closest to 0 for ranges without finite bounds).
+def residueMembers(cond, ranges, num, r):
+    seen = set()
+    for bottom, top in ranges:
+        if not isInfinite(bottom):
+            bottom = ceil(bottom)
+        if not isInfinite(top):
+            top = floor(top)
+        starts = []
+        if not isInfinite(bottom):
+            starts.append((bottom + (r - bottom) % num, num))
+        if not isInfinite(top):
+            starts.append((top - (top - r) % num, -num))
+        if len(starts) == 0:
+            starts = [(r % num, num), (r % num - num, -num)]
+        for start, step in starts:
+            for k in range(WITNESS_LIMIT):
+                candidate = start + k * step
+                if not bottom <= candidate <= top:
+                    break
+                if candidate not in seen and cond.contains(candidate):
+                    seen.add(candidate)
+                    yield candidate
 
 
 # Given a `target` map of mod values that are required by a boolean condition,
@@ -49,14 +189,30 @@ def checkClosure(cond, func):
 def checkMod(target, inferred):
     for key in target:
         if key not in inferred:
-            raise ValueError(
-                "!!! Error: inferred mod vals does not contain an entry for target key " + str(key) + " !!!")
+            raise LazyError(
+                "!!! Error: inferred mod vals does not contain an entry for target key ", key, " !!!")
             return False
         if not isSubset(inferred[key], target[key]):
             return False
     return True
 
 
+# Given a simplified boolean expression `cond(x)`, getRanges returns
+# (ranges, bottoms, tops), where ranges[i] == (bottoms[i], tops[i]) is the
+# range that may contain x in the i-th element of cond.flatten().
+def getRanges(cond):
+    ranges = []
+    bottoms = []
+    tops = []
+    for elt in cond.flatten():
+        bottom = getBottom(elt)
+        top = getTop(elt)
+        ranges.append((bottom, top))
+        bottoms.append(bottom)
+        tops.append(top)
+    return ranges, bottoms, tops
+
+
 # Given a list `targetForbidden` of ranges that are not allowed to contain
 # a number, and a list `inferredAllowed` of ranges that may contain the
 # number, checkRanges returns true if and only none of the allowed ranges
@@ -74,58 +230,13 @@ def checkRanges(targetForbidden, inferredAllowed):
 
 # Given a boolean expression `cond(x)`, getModVals returns a map
 # n => [v_1, v_2, ... v_k] where each v_i is a possible number
-# that x % n is allowed to be equal to.
+# that x % n is allowed to be equal to (see getBoundInfo).
 def getModVals(cond):
-    if isinstance(cond, And):
-        l = getModVals(cond.left)
-        r = getModVals(cond.right)
-        return intersectMaps(l, r)
-    if isinstance(cond, Or):
-        l = getModVals(cond.left)
-        r = getModVals(cond.right)
-        return unionMaps(l, r)
-    # x % i == j implies i => [j]
-    elif isinstance(cond, Equal):
-        i, j, exists = getModIJ(cond)
-        if exists:
-            return {i: [j]}
-        else:
-            return {}
-    # x % i > j implies i => [j + 1, ..., i - 1]
-    elif isinstance(cond, Greater):
-        i, j, exists = getModIJ(cond)
-        if exists:
-            if i > j + 1:
-                return {i: list(range(j + 1, i))}
-            else:
-                raise ValueError(
-                    "!!! Invalid modulo greater operator: " + str(cond) + " !!!")
-                return {}
-        else:
-            return {}
-    # x % i >= j implies i => [j, ..., i - 1]
-    elif isinstance(cond, Geq):
-        i, j, exists = getModIJ(cond)
-        if exists:
-            return {i: list(range(j, i))}
-        else:
-            return {}
-    # x % i < j implies i => [0, ..., j - 1]
-    elif isinstance(cond, Less):
-        i, j, exists = getModIJ(cond)
-        if exists:
-            return {i: list(range(0, j))}
-        else:
-            return {}
-    # x % i <= j implies i => [0, ..., j]
-    elif isinstance(cond, Leq):
-        i, j, exists = getModIJ(cond)
-        if exists:
-            return {i: list(range(0, j + 1))}
-        else:
-            return {}
-    else:
-        return {}
+    info = getBoundInfo(cond)
+    if info.modError is not None:
+        raise LazyError(
+            "!!! Invalid modulo greater operator: ", info.modError, " !!!")
+    return info.modVals
 
 
 # If `cond` is of the form x % i OP j, where OP is ==, >, >=, <, or <=
@@ -147,26 +258,15 @@ def getModIJ(cond):
 # Given a function f(x, y) and a map of mod values that both x and y
 # fulfill, return the map of modValues that f(x, y) fulfill.
 def inferModVals(f, modVals):
-    result = {}
-    for key in modVals:
-        result[key] = inferOneModVal(f, key, modVals[key])
-    return result
+    residues = ResidueDomain(modVals, isCommutative(f))
+    return residues.residues(analyze(f, [residues])[0])
 
 
 # Given a function f(x, y), a number num, and a list vals of numbers
 # that x % num and y % num can be equal to, return a list of numbers
 # that f(x, y) % num can be equal to.
 def inferOneModVal(f, num, vals):
-    result = []
-    for i in vals:
-        for j in vals:
-            n, exists = EvalTwoNums(i, j).transform(f).simplify().eval()
-            if exists:
-                result.append(n % num)
-            else:
-                raise ValueError("!!! Failed to evaluate " + str(f) +
-                                 " with integers " + str(i) + " and " + str(j) + " !!!")
-    return list(set(result))
+    return inferModVals(f, {num: vals})[num]
 
 
 ###### Functions for computing target and inferred ranges ######
@@ -189,147 +289,152 @@ def getAllowedRanges(c):
 # Given a list `bottoms` of the minimum values that may contain a number
 # and a list `tops` of the maximum values that may contain a number,
 # getForbiddenRanges returns a list of ranges that are not allowed to
-# contain the number.
+# contain the number, i.e. the gaps between and around the ranges
+# [bottoms[i], tops[i]].
 def getForbiddenRanges(bottoms, tops):
-    bottoms.sort()
-    tops.sort()
     bad = []
-
-    for index, t in enumerate(tops):
-        if t == TOP:
-            continue
-        topVal = t + 1
-        foundOverlap = False
-        for overlapIndex, b in enumerate(bottoms):
-            if b <= topVal:
-                tCheck = tops[overlapIndex]
-                if tCheck >= topVal:
-                    foundOverlap = True
-                    break
-        if foundOverlap:
-            continue
-        options = [value for value in bottoms if value > topVal]
-        minBottomGreaterThanTopVal = topVal
-        if len(options) > 0:
-            minBottomGreaterThanTopVal = min(options)
-        bad.append((topVal, minBottomGreaterThanTopVal - 1))
-
-    for index, b in enumerate(bottoms):
-        if b == BOTTOM:
-            continue
-        bottomVal = b - 1
-        foundOverlap = False
-        for overlapIndex, t in enumerate(tops):
-            if t >= bottomVal:
-                bCheck = bottoms[overlapIndex]
-                if bCheck <= bottomVal:
-                    foundOverlap = True
-                    break
-        if foundOverlap:
-            continue
-        options = [value for value in tops if value < bottomVal]
-        minTopLessThanBottomVal = BOTTOM - 1
-        if len(options) > 0:
-            minBottomLessThanBottomVal = min(options)
-        bad.append((minTopLessThanBottomVal + 1, bottomVal))
-
+    lowest = BOTTOM
+    for bottom, top in unionRanges(zip(bottoms, tops)):
+        if bottom > lowest:
+            bad.append((lowest, bottom - 1))
+        lowest = top + 1
+    if lowest < TOP:
+        bad.append((lowest, TOP))
     return bad
 
 
 # Given a boolean expression `cond(x)`, getBottom returns the minimum value of x.
 def getBottom(cond):
-    eq, eqExists = getEqual(cond)
-    if eqExists:
-        return eq
-    elif isinstance(cond, And):
-        l = getBottom(cond.left)
-        r = getBottom(cond.right)
-        return max(l, r)
-    elif isinstance(cond, Or):
-        l = getBottom(cond.left)
-        r = getBottom(cond.right)
-        return min(l, r)
-    elif isinstance(cond, Equal):
-        return getRHSConst(cond, BOTTOM)
-    elif isinstance(cond, Greater):
-        c = getRHSConst(cond, BOTTOM)
-        if c == BOTTOM:
-            return c
-        else:
-            return c + 1
-    elif isinstance(cond, Geq):
-        return getRHSConst(cond, BOTTOM)
-    elif isinstance(cond, Less):
-        return BOTTOM
-    elif isinstance(cond, Leq):
-        return BOTTOM
-    else:
-        return BOTTOM
+    return getCheckedBoundInfo(cond).bottom
 
 
 # Given a boolean expression `cond(x)`, getTop returns the maximum value of x.
 def getTop(cond):
-    eq, eqExists = getEqual(cond)
-    if eqExists:
-        return eq
-    elif isinstance(cond, And):
-        l = getTop(cond.left)
-        r = getTop(cond.right)
-        return min(l, r)
-    elif isinstance(cond, Or):
-        l = getTop(cond.left)
-        r = getTop(cond.right)
-        return max(l, r)
-    elif isinstance(cond, Equal):
-        return getRHSConst(cond, TOP)
-    elif isinstance(cond, Greater):
-        return TOP
-    elif isinstance(cond, Geq):
-        return TOP
-    elif isinstance(cond, Less):
-        c = getRHSConst(cond, TOP)
-        if c == TOP:
-            return c
-        else:
-            return c - 1
-    elif isinstance(cond, Leq):
-        return getRHSConst(cond, TOP)
-    else:
-        return TOP
+    return getCheckedBoundInfo(cond).top
 
 
 # Given a boolean expression `cond(x)`, if `cond` implies that x must be equal
 # to a number n, getEqual returns (n, True). Otherwise, it returns (0, False).
 def getEqual(cond):
-    if isinstance(cond, And):
-        l, lExists = getEqual(cond.left)
-        r, rExists = getEqual(cond.right)
-        if lExists and rExists:
-            if l == r:
-                return l, True
-            else:
-                raise ValueError(
-                    "!!! Error: conflicting equality values " + str(l) + " and " + str(r) + " !!!")
-                return 0, False
-        elif lExists:
-            return l, True
-        elif rExists:
-            return r, True
-        return 0, False
-    elif isinstance(cond, Or):
-        l, lExists = getEqual(cond.left)
-        r, rExists = getEqual(cond.right)
-        if lExists and rExists:
-            if l == r:
-                return l, True
-            else:
-                return 0, False
-        return 0, False
-    elif isinstance(cond, Equal):
+    info = getCheckedBoundInfo(cond)
+    return info.eq, info.eqExists
+
+
+# Returns the BoundInfo of `cond`, raising an error if `cond` requires x to
+# be equal to two different numbers.
+def getCheckedBoundInfo(cond):
+    info = getBoundInfo(cond)
+    if info.eqError is not None:
+        l, r = info.eqError
+        raise LazyError(
+            "!!! Error: conflicting equality values ", l, " and ", r, " !!!")
+    return info
+
+
+# What a boolean expression `cond(x)` says about x:
+# 1. bottom and top are the minimum and maximum values of x, and:
+# 2. If eqExists is true, x must be equal to eq, and:
+# 3. modVals maps n => [v_1, v_2, ... v_k] where each v_i is a possible
+#    number that x % n is allowed to be equal to, and:
+# 4. modError is the first invalid modulo condition of `cond` (such as
+#    x % 3 > 2), or None, and:
+# 5. eqError is the first pair of different numbers that an && of `cond`
+#    requires x to be equal to, or None.
+# The errors are only raised by the functions that need the corresponding
+# values, as bounds and mod values are extracted together.
+class BoundInfo:
+    __slots__ = ('bottom', 'top', 'eq', 'eqExists',
+                 'modVals', 'modError', 'eqError')
+
+    def __init__(self, bottom, top, eq, eqExists, modVals, modError=None, eqError=None):
+        self.bottom = bottom
+        self.top = top
+        self.eq = eq
+        self.eqExists = eqExists
+        self.modVals = modVals
+        self.modError = modError
+        self.eqError = eqError
+
+
+# Returns the BoundInfo of the boolean expression `cond(x)`. It is computed
+# for every subtree in a single bottom-up pass, and memoized on each node.
+def getBoundInfo(cond):
+    if cond.boundCache is None:
+        cond.boundCache = computeBoundInfo(cond)
+    return cond.boundCache
+
+
+# Computes the BoundInfo of `cond` from the BoundInfos of its children.
+def computeBoundInfo(cond):
+    if isinstance(cond, And) or isinstance(cond, Or):
+        l = getBoundInfo(cond.left)
+        r = getBoundInfo(cond.right)
+        modError = l.modError if l.modError is not None else r.modError
+        eqError = l.eqError if l.eqError is not None else r.eqError
+        if isinstance(cond, And):
+            eq, eqExists = 0, False
+            if l.eqExists and r.eqExists:
+                if l.eq != r.eq:
+                    if eqError is None:
+                        eqError = (l.eq, r.eq)
+                else:
+                    eq, eqExists = l.eq, True
+            elif l.eqExists:
+                eq, eqExists = l.eq, True
+            elif r.eqExists:
+                eq, eqExists = r.eq, True
+            bottom, top = max(l.bottom, r.bottom), min(l.top, r.top)
+            modVals = intersectMaps(l.modVals, r.modVals)
+        else:
+            eq, eqExists = 0, False
+            if l.eqExists and r.eqExists and l.eq == r.eq:
+                eq, eqExists = l.eq, True
+            bottom, top = min(l.bottom, r.bottom), max(l.top, r.top)
+            modVals = unionMaps(l.modVals, r.modVals)
+        if eqExists:
+            bottom, top = eq, eq
+        return BoundInfo(bottom, top, eq, eqExists, modVals, modError, eqError)
+
+    bottom, top = BOTTOM, TOP
+    modVals = {}
+    modError = None
+    i, j, modExists = getModIJ(cond)
+    if isinstance(cond, Equal):
         eq = getRHSConst(cond, TOP)
-        return eq, eq != TOP
-    else:
-        return 0, False
+        if eq != TOP:
+            return BoundInfo(eq, eq, eq, True, {})
+        n, selfBound = getModSelfBound(cond)
+        if selfBound:
+            bottom, top = 0, n - 1
+        # x % i == j implies i => [j]
+        if modExists:
+            modVals = {i: [j]}
+    elif isinstance(cond, Greater):
+        c = getRHSConst(cond, BOTTOM)
+        bottom = c if c == BOTTOM else c + 1
+        # x % i > j implies i => [j + 1, ..., i - 1]
+        if modExists:
+            if i > j + 1:
+                modVals = {i: list(range(j + 1, i))}
+            else:
+                modError = cond
+    elif isinstance(cond, Geq):
+        bottom = getRHSConst(cond, BOTTOM)
+        # x % i >= j implies i => [j, ..., i - 1]
+        if modExists:
+            modVals = {i: list(range(j, i))}
+    elif isinstance(cond, Less):
+        c = getRHSConst(cond, TOP)
+        top = c if c == TOP else c - 1
+        # x % i < j implies i => [0, ..., j - 1]
+        if modExists:
+            modVals = {i: list(range(0, j))}
+    elif isinstance(cond, Leq):
+        top = getRHSConst(cond, TOP)
+        # x % i <= j implies i => [0, ..., j]
+        if modExists:
+            modVals = {i: list(range(0, j + 1))}
+    return BoundInfo(bottom, top, 0, False, modVals, modError)
 
 
 # Given a boolean expression `cond(x)` and a number `default`, if `cond`
@@ -345,66 +450,29 @@ def getRHSConst(cond, default):
     return default
 
 
+# If `cond` is of the form x % n == x or x == x % n, where n is a positive
+# integer constant, x must be in the range [0, n - 1] and getModSelfBound
+# returns (n, True). Otherwise, it returns (0, False).
+def getModSelfBound(cond):
+    if not isinstance(cond, Equal):
+        return 0, False
+    mod = cond.left
+    other = cond.right
+    if isinstance(other, Mod):
+        mod = cond.right
+        other = cond.left
+    if isinstance(mod, Mod) and isinstance(mod.left, X) and isinstance(other, X):
+        n, nExists = mod.right.eval()
+        if nExists and n > 0:
+            return n, True
+    return 0, False
+
+
 # Given a function `f(x, y)` and a list allowedRanges of the ranges that
 # may contain x and y, inferAllowedRanges returns a list of the ranges
-# that may contain `f(x, y)`.
+# that may contain `f(x, y)` (see IntervalDomain).
 def inferAllowedRanges(f, allowedRanges):
-    allowed = []
-    val, exists = f.eval()
-    if exists:
-        allowed.append((val, val))
-    elif isinstance(f, X) or isinstance(f, Y):
-        return allowedRanges
-    elif isinstance(f, Add):
-        left = inferAllowedRanges(f.left, allowedRanges)
-        right = inferAllowedRanges(f.right, allowedRanges)
-        for l in left:
-            for r in right:
-                bb = l[0] + r[0]
-                tt = l[1] + r[1]
-                allowed.append((bb, tt))
-    elif isinstance(f, Sub):
-        left = inferAllowedRanges(f.left, allowedRanges)
-        right = inferAllowedRanges(f.right, allowedRanges)
-        for l in left:
-            for r in right:
-                bb = l[0] - r[0]
-                bt = l[0] - r[1]
-                tb = l[1] - r[0]
-                tt = l[1] - r[1]
-                vals = [bb, bt, tb, tt]
-                allowed.append((min(vals), max(vals)))
-    elif isinstance(f, Mult):
-        left = inferAllowedRanges(f.left, allowedRanges)
-        right = inferAllowedRanges(f.right, allowedRanges)
-        for l in left:
-            for r in right:
-                bb = l[0] * r[0]
-                bt = l[0] * r[1]
-                tb = l[1] * r[0]
-                tt = l[1] * r[1]
-                vals = [bb, bt, tb, tt]
-                allowed.append((min(vals), max(vals)))
-    elif isinstance(f, Minus):
-        child = inferAllowedRanges(f.child, allowedRanges)
-        for c in child:
-            allowed.append((-c[1], -c[0]))
-    elif isinstance(f, Div):
-        left = inferAllowedRanges(f.left, allowedRanges)
-        right = inferAllowedRanges(f.right, allowedRanges)
-        for l in left:
-            for r in right:
-                vals = []
-                if r[0] != 0:
-                    vals.append(int(l[0] / r[0]))
-                    vals.append(int(l[1] / r[0]))
-                if r[1] != 0:
-                    vals.append(int(l[0] / r[1]))
-                    vals.append(int(l[1] / r[1]))
-                allowed.append((min(vals), max(vals)))
-    else:
-        allowed.append((BOTTOM, TOP))
-    return allowed
+    return analyze(f, [IntervalDomain(allowedRanges)])[0]
 
 
 ###### Helper functions ######
@@ -419,12 +487,7 @@ def rangeOverlaps(src, dst):
 
 # Returns true if the number num is within the range r.
 def numInRange(num, r):
-    bottom = r[0]
-    top = r[1]
-    if bottom <= BOTTOM or num >= bottom:
-        if top >= TOP or num <= top:
-            return True
-    return False
+    return r[0] <= num <= r[1]
 
 
 # Returns a map of number => list of numbers where,
@@ -452,18 +515,15 @@ def intersectLists(l, r):
 
 
 # Returns a map of number => list of numbers, where,
-# for each key k that is present in l or r:
+# for each key k that is present in both maps l and r:
 # result[k] = l[k] union r[k]
+# A key that is present in only one map constrains only one side of the
+# union, so the union allows every residue for it and it is left out.
 def unionMaps(l, r):
     result = {}
     for key in l:
-        if key in r.keys():
+        if key in r:
             result[key] = unionLists(l[key], r[key])
-        else:
-            result[key] = l[key]
-    for key in r:
-        if key not in r.keys():
-            result[key] = r[key]
     return result
 
 
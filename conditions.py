@@ -1,20 +1,33 @@
 from functions import *
 from constants import *
+from solver import *
 
 
 # Represents an expression of type boolean
+# As in Math, constant attributes are class attributes and every class
+# declares __slots__.
 class Condition:
+    __slots__ = ('strCache', 'boundCache')
+    wrapParens = True
+
     def __init__(self):
-        self.wrapParens = True
+        countNode()
+        self.strCache = None
+        self.boundCache = None
 
     def __str__(self):
-        return "Condition"
+        return render(self)
+
+    # Returns a list of strings and (child, wrapped) pairs that make up the
+    # string representation of this condition (see render.py).
+    def pieces(self):
+        return ["Condition"]
+
+    def needsParens(self):
+        return self.wrapParens
 
     def wrap(self):
-        if self.wrapParens:
-            return "(" + str(self) + ")"
-        else:
-            return str(self)
+        return renderWrapped(self)
 
     def convert(self, e):
         if isinstance(e, int):
@@ -29,6 +42,8 @@ class Condition:
             return X()
         elif e == y:
             return Y()
+        elif e == k:
+            return K()
         elif isinstance(e, str):
             return LogicVar(e)
         elif isinstance(e, Math) or isinstance(e, Condition):
@@ -43,9 +58,40 @@ class Condition:
     def flatten(self):
         return [self]
 
+    # Returns true if the integer n is a member of the set of integers
+    # described by this condition (see membership.py).
+    def contains(self, n):
+        from membership import getMembership
+        return getMembership(self).contains(n)
+
+    # Given a NumPy array of integers, returns the boolean array of whether
+    # each integer is a member of the set described by this condition.
+    def containsMany(self, values):
+        from membership import getMembership
+        return getMembership(self).containsMany(values)
+
+    # Yields the members x of the set described by this condition with
+    # lo <= x <= hi, in increasing order.
+    def members(self, lo, hi=TOP):
+        from membership import getMembership
+        return getMembership(self).members(lo, hi)
+
+    # Yields the members x of the set described by this condition with
+    # lo <= x <= hi, as NumPy arrays covering windows of `chunkSize`
+    # consecutive integers.
+    def memberChunks(self, lo, hi, chunkSize=1 << 16):
+        from membership import getMembership
+        return getMembership(self).memberChunks(lo, hi, chunkSize)
+
     def eval(self):
         return False
 
+    # Returns a hashable value that identifies the structure of this
+    # condition. Two conditions have equal keys if and only if they
+    # are the same tree.
+    def key(self):
+        return (type(self).__name__,)
+
     def bottom(self):
         return BOTTOM
 
@@ -54,26 +100,50 @@ class Condition:
 
 
 # Used to represent the set of all integers
+# There is a single shared instance: calling All() always returns it.
 class All(Condition):
+    __slots__ = ()
+    wrapParens = False
+
+    def __new__(cls):
+        instance = cls.__dict__.get("instance")
+        if instance is None:
+            instance = super().__new__(cls)
+            instance.strCache = None
+            instance.boundCache = None
+            cls.instance = instance
+        return instance
+
     def __init__(self):
-        super().__init__()
-        self.wrapParens = False
+        pass
 
-    def __str__(self):
-        return "True"
+    def pieces(self):
+        return ["True"]
 
     def eval(self):
         return True
 
 
 # Used to represent the empty set of integers
+# There is a single shared instance: calling Empty() always returns it.
 class Empty(Condition):
+    __slots__ = ()
+    wrapParens = False
+
+    def __new__(cls):
+        instance = cls.__dict__.get("instance")
+        if instance is None:
+            instance = super().__new__(cls)
+            instance.strCache = None
+            instance.boundCache = None
+            cls.instance = instance
+        return instance
+
     def __init__(self):
-        super().__init__()
-        self.wrapParens = False
+        pass
 
-    def __str__(self):
-        return "False"
+    def pieces(self):
+        return ["False"]
 
     def eval(self):
         return False
@@ -81,13 +151,18 @@ class Empty(Condition):
 
 # Logical variables (for now, just used for debugging)
 class LogicVar(Condition):
+    __slots__ = ('name',)
+    wrapParens = False
+
     def __init__(self, name):
         super().__init__()
-        self.wrapParens = False
         self.name = name
 
-    def __str__(self):
-        return self.name
+    def pieces(self):
+        return [self.name]
+
+    def key(self):
+        return (type(self).__name__, self.name)
 
     def compare(self, other):
       if isinstance(other, LogicVar):
@@ -103,14 +178,20 @@ class LogicVar(Condition):
 
 # (Boolean, Boolean) -> Boolean
 class And(Condition):
+    __slots__ = ('left', 'right')
+
     def __init__(self, left, right):
         super().__init__()
         self.left = self.convert(left)
         self.right = self.convert(right)
 
-    def __str__(self):
-        return self.left.wrap() + " && " + self.right.wrap()
+    def pieces(self):
+        return [(self.left, True), " && ", (self.right, True)]
 
+    def key(self):
+        return (type(self).__name__, self.left.key(), self.right.key())
+
+    @limited
     def simplify(self):
         return And(self.left.simplify(), self.right.simplify())
 
@@ -120,6 +201,8 @@ class And(Condition):
         result = []
         for first in l:
             for second in r:
+                checkpoint()
+                countTermsSoFar(len(result) + 1)
                 result.append(And(first, second))
         return result
 
@@ -132,21 +215,27 @@ class And(Condition):
 
 # (Boolean, Boolean) -> Boolean
 class Or(Condition):
+    __slots__ = ('left', 'right')
+
     def __init__(self, left, right):
         super().__init__()
         self.left = self.convert(left)
         self.right = self.convert(right)
 
-    def __str__(self):
-        return self.left.wrap() + " || " + self.right.wrap()
+    def pieces(self):
+        return [(self.left, True), " || ", (self.right, True)]
+
+    def key(self):
+        return (type(self).__name__, self.left.key(), self.right.key())
 
+    @limited
     def simplify(self):
         return Or(self.left.simplify(), self.right.simplify())
 
     def flatten(self):
         l = self.left.flatten()
         r = self.right.flatten()
-        return l + r
+        return countTerms(l + r)
 
     def eval(self):
         l = self.left.eval()
@@ -157,22 +246,26 @@ class Or(Condition):
 
 # Binary conditions of the form (Int, Int) -> Boolean
 class BinaryCondition(Condition):
+    __slots__ = ('left', 'right')
+
     def __init__(self, left, right):
         super().__init__()
         self.left = self.convert(left)
         self.right = self.convert(right)
 
+    def key(self):
+        return (type(self).__name__, self.left.key(), self.right.key())
+
     def solve(self):
         return self, False
 
 
 # (Int, Int) -> Boolean
 class Equal(BinaryCondition):
-    def __init__(self, left, right):
-        super().__init__(left, right)
+    __slots__ = ()
 
-    def __str__(self):
-        return str(self.left) + " == " + str(self.right)
+    def pieces(self):
+        return [(self.left, False), " == ", (self.right, False)]
 
     def simplify(self):
         l = self.left.simplify()
@@ -211,7 +304,13 @@ class Equal(BinaryCondition):
 
         return Equal(l, r)
 
+    # Solves this equation for a. Equations that are linear in a are solved
+    # in closed form by solveFor. Otherwise, a few syntactic shapes are
+    # handled by rewriting the equation.
     def solve(self):
+        solution, solutionExists = solveFor(self.left, self.right, A())
+        if solutionExists:
+            return Equal(A(), solution), True
         if isinstance(self.left, A):
             return self, True
         elif isinstance(self.left, Add):
@@ -245,11 +344,10 @@ class Equal(BinaryCondition):
 
 # (Int, Int) -> Boolean
 class Greater(BinaryCondition):
-    def __init__(self, left, right):
-        super().__init__(left, right)
+    __slots__ = ()
 
-    def __str__(self):
-        return str(self.left) + " > " + str(self.right)
+    def pieces(self):
+        return [(self.left, False), " > ", (self.right, False)]
 
     def simplify(self):
         l = self.left.simplify()
@@ -294,11 +392,10 @@ class Greater(BinaryCondition):
 
 # (Int, Int) -> Boolean
 class Geq(BinaryCondition):
-    def __init__(self, left, right):
-        super().__init__(left, right)
+    __slots__ = ()
 
-    def __str__(self):
-        return str(self.left) + " >= " + str(self.right)
+    def pieces(self):
+        return [(self.left, False), " >= ", (self.right, False)]
 
     def simplify(self):
         l = self.left.simplify()
@@ -343,11 +440,10 @@ class Geq(BinaryCondition):
 
 # (Int, Int) -> Boolean
 class Less(BinaryCondition):
-    def __init__(self, left, right):
-        super().__init__(left, right)
+    __slots__ = ()
 
-    def __str__(self):
-        return str(self.left) + " < " + str(self.right)
+    def pieces(self):
+        return [(self.left, False), " < ", (self.right, False)]
 
     def simplify(self):
         l = self.left.simplify()
@@ -392,11 +488,10 @@ class Less(BinaryCondition):
 
 # (Int, Int) -> Boolean
 class Leq(BinaryCondition):
-    def __init__(self, left, right):
-        super().__init__(left, right)
+    __slots__ = ()
 
-    def __str__(self):
-        return str(self.left) + " <= " + str(self.right)
+    def pieces(self):
+        return [(self.left, False), " <= ", (self.right, False)]
 
     def simplify(self):
         l = self.left.simplify()
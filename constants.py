@@ -1,4 +1,72 @@
-import sys
+from bounds import *
 
-TOP = sys.maxsize
-BOTTOM = -sys.maxsize
+# The upper and lower bounds of unbounded ranges of integers.
+TOP = Infinity(1)
+BOTTOM = Infinity(-1)
+
+# The maximum number of ranges that range inference keeps for a single
+# expression; closer ranges are merged beyond that.
+MAX_RANGES = 16
+
+# The maximum number of members of a set for which the group axioms are
+# decided by building the full operation table.
+FINITE_LIMIT = 512
+
+# The maximum number of entries of each cache of intermediate results (see
+# cache.py).
+CACHE_SIZE = 1 << 16
+
+# The number of entries of a table-backed function that are rendered.
+TABLE_PREVIEW = 8
+
+# The maximum number of entries of the intermediate arrays built while
+# checking associativity of an operation table.
+ASSOC_CHUNK = 1 << 22
+
+# The maximum period (least common multiple of the moduli of a condition)
+# for which members are enumerated by stepping through residue classes.
+RESIDUE_PERIOD_LIMIT = 1 << 16
+
+# The maximum number of entries of an operation table that are computed
+# at once while exporting the table.
+EXPORT_CHUNK = 1 << 22
+
+# The range of the 64-bit integers in which operation tables are exported.
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+# Identity candidates are searched among the members e with
+# -SEARCH_LIMIT <= e <= SEARCH_LIMIT, and are tested on SEARCH_SAMPLES
+# members chosen at random (with the seed SEARCH_SEED, so that searches
+# are reproducible).
+SEARCH_LIMIT = 64
+SEARCH_SAMPLES = 8
+SEARCH_SEED = 0
+
+# The maximum period L for which the associativity of an operation
+# containing % is checked over the L * L * L triples of residues (see
+# periodic.py).
+PERIODIC_ASSOC_LIMIT = 256
+
+# The number of triples on which an operation is evaluated to refute its
+# associativity when its period is too large to check on residues.
+ASSOC_SAMPLES = 1024
+
+# The maximum modulus M to which the residues of a condition are lifted
+# when the residues of an operation modulo n depend on its arguments
+# modulo M (see checkClosureWitness).
+RESIDUE_LIFT_LIMIT = 1 << 10
+
+# The maximum number of residue pairs that the exact closure check of
+# linear operations enumerates before giving up (see presburger.py).
+PRESBURGER_LIMIT = 1 << 20
+
+# The number of candidates in each residue class (and near each bound) that
+# are tried when reconstructing a counterexample to closure (see
+# checkClosureWitness).
+WITNESS_LIMIT = 64
+
+# Verdicts of a group check (see runner.py).
+GROUP = "group"
+NOT_GROUP = "not a group"
+UNKNOWN = "unknown"
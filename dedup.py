@@ -0,0 +1,158 @@
+import asyncio
+
+from runner import *
+from solver import *
+
+
+# Deduplication of catalogs of (cond, func) candidates.
+#
+# Catalogs often contain candidates that describe the same group, such as
+# f(x, y) = x + y and f(x, y) = y + x, or x - (-y) and x + y, or conditions
+# that only differ in the order of their operands. Each candidate is given
+# a canonical fingerprint of its simplified condition and operation, and
+# only one representative of each class of candidates with the same
+# fingerprint is checked; its verdict is shared by the whole class.
+#
+# Swapping x and y in f gives the opposite operation, which is a group
+# operation on the same set, with the same identity and inverses, if and
+# only if f is, so fingerprints do not depend on the names of x and y.
+
+
+# Returns the canonical fingerprint of the candidate (cond, func).
+def fingerprint(cond, func):
+    return conditionFingerprint(cond.simplify()), functionFingerprint(func.simplify())
+
+
+# Returns the canonical fingerprint of the integer function `f(x, y)`,
+# which is the smallest of the canonical keys of f(x, y) and f(y, x).
+def functionFingerprint(f):
+    return min(canonicalKey(f, False), canonicalKey(f, True))
+
+
+# Returns a hashable key of the integer function `expr` such that functions
+# that are equal as polynomials, or that only differ in the order of the
+# operands of + and *, have the same key. If `swap` is true, x and y are
+# swapped (variables only appear in the polynomial parts of the key, since
+# every variable is a polynomial).
+def canonicalKey(expr, swap):
+    poly, isPolynomial = toPolynomial(expr)
+    if isPolynomial:
+        if swap:
+            poly = swapPolynomial(poly)
+        return ("poly", tuple(sorted(poly.items())))
+    if isinstance(expr, Add) or isinstance(expr, Mult):
+        operands = sorted(canonicalKey(e, swap)
+                          for e in commutativeOperands(expr, type(expr)))
+        return ("tree", int(expr.kind)) + tuple(operands)
+    elif isinstance(expr, BinaryMath):
+        return ("tree", int(expr.kind), canonicalKey(expr.left, swap), canonicalKey(expr.right, swap))
+    elif isinstance(expr, Minus):
+        return ("tree", int(expr.kind), canonicalKey(expr.child, swap))
+    return ("tree",) + expr.key()
+
+
+# Returns the list of operands of the nested applications of the
+# commutative and associative operator `kind` (Add or Mult) at the root
+# of `expr`. For example, the operands of (x + y) + (x % 2) are
+# [x, y, x % 2].
+def commutativeOperands(expr, kind):
+    operands = []
+    stack = [expr]
+    while len(stack) > 0:
+        e = stack.pop()
+        if type(e) == kind:
+            stack.append(e.right)
+            stack.append(e.left)
+        else:
+            operands.append(e)
+    return operands
+
+
+# Returns the canonical fingerprint of the boolean condition `cond(x)`:
+# the operands of && and || are sorted, the operands of == are sorted, and
+# a > b and a >= b are rewritten as b < a and b <= a.
+def conditionFingerprint(cond):
+    if isinstance(cond, And) or isinstance(cond, Or):
+        operands = []
+        stack = [cond]
+        while len(stack) > 0:
+            c = stack.pop()
+            if type(c) == type(cond):
+                stack.append(c.right)
+                stack.append(c.left)
+            else:
+                operands.append(conditionFingerprint(c))
+        return (type(cond).__name__,) + tuple(sorted(operands))
+    elif isinstance(cond, Equal):
+        sides = sorted([canonicalKey(cond.left, False), canonicalKey(cond.right, False)])
+        return ("Equal",) + tuple(sides)
+    elif isinstance(cond, Greater):
+        return ("Less", canonicalKey(cond.right, False), canonicalKey(cond.left, False))
+    elif isinstance(cond, Geq):
+        return ("Leq", canonicalKey(cond.right, False), canonicalKey(cond.left, False))
+    elif isinstance(cond, BinaryCondition):
+        return (type(cond).__name__, canonicalKey(cond.left, False), canonicalKey(cond.right, False))
+    return cond.key()
+
+
+# Groups a list of (cond, func) candidates by fingerprint.
+# Returns (representatives, classes), where representatives is the list of
+# the indices of the first candidate of each class, and classes[i] is the
+# position in representatives of the class of candidate i.
+def dedupCatalog(candidates):
+    representatives = []
+    classes = []
+    seen = {}
+    for i, (cond, func) in enumerate(candidates):
+        key = fingerprint(cond, func)
+        if key not in seen:
+            seen[key] = len(representatives)
+            representatives.append(i)
+        classes.append(seen[key])
+    return representatives, classes
+
+
+# Checks a list of (cond, func) candidates, checking only one candidate of
+# each class of duplicates (see dedupCatalog), and empties the caches of
+# intermediate results once the batch is done (see clearCaches).
+# Returns the list of CheckResults in the same order as the candidates.
+def checkCatalog(candidates, token=None):
+    representatives, classes = dedupCatalog(candidates)
+    try:
+        results = [checkGroup(*candidates[i], token) for i in representatives]
+    finally:
+        clearCaches()
+    return [results[c] for c in classes]
+
+
+# Like checkCatalog, but checks the representatives concurrently, as in
+# checkGroupsAsync (which empties the caches once the batch is done).
+async def checkCatalogAsync(candidates, timeout=None, executor=None, budget=None):
+    representatives, classes = dedupCatalog(candidates)
+    results = await checkGroupsAsync([candidates[i] for i in representatives],
+                                     timeout, executor, budget)
+    return [results[c] for c in classes]
+
+
+def main():
+    print("\n\n\n------- MAIN ------")
+    candidates = [
+        (All(), Add(x, y)),
+        (All(), Add(y, x)),
+        (All(), Sub(x, Minus(y))),
+        (Geq(x, 0), Add(x, y)),
+        (Leq(0, x), Add(y, x)),
+        (All(), Mod(Add(x, y), 7)),
+        (All(), Mod(Add(y, x), 7)),
+        (All(), Sub(x, y)),
+        (All(), Sub(y, x)),
+    ]
+    representatives, classes = dedupCatalog(candidates)
+    print(len(candidates), "candidates,", len(representatives), "checked")
+    results = asyncio.run(checkCatalogAsync(candidates, 0.5))
+    for (cond, func), result in zip(candidates, results):
+        print("c(x) =", cond, ", f(x, y) =", func, ":", result)
+
+
+if __name__ == "__main__":
+    main()
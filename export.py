@@ -0,0 +1,66 @@
+import itertools
+
+from groups import *
+from vectorize import *
+
+
+# Given a group `g`, exportTable writes the operation table of g over its
+# first `n` members greater than or equal to `lo`, i.e. the n x n table
+# whose entry (i, j) is f(members[i], members[j]).
+#
+# The table is computed in blocks of rows with vectorized evaluation and
+# written directly to disk, so tables larger than memory can be exported:
+# - If `chunked` is false, `path` is a .npy file that is filled through a
+#   memory map and can be loaded with np.load(path, mmap_mode="r").
+# - If `chunked` is true, the rows are appended to `path` as raw native
+#   int64 values, one block after another.
+#
+# Raises ValueError if g is not a group, or if an entry of the table does
+# not fit in a 64-bit integer. Returns the NumPy array of members
+# that index the rows and columns of the table.
+def exportTable(g, path, lo, n, chunked=False):
+    if not hasNumpy():
+        raise ValueError("!!! Exporting operation tables requires NumPy !!!")
+    result, reason = g.check()
+    if not result:
+        raise LazyError("!!! ", g, " is not a group: ", reason, " !!!")
+    members = np.fromiter(itertools.islice(g.cond.members(lo), n),
+                          dtype=np.int64)
+    size = len(members)
+    rows = max(1, EXPORT_CHUNK // max(1, size))
+
+    if chunked:
+        with open(path, "wb") as out:
+            for block in tableBlocks(g.func, members, rows):
+                block.tofile(out)
+        return members
+
+    table = np.lib.format.open_memmap(path, mode="w+", dtype=np.int64,
+                                      shape=(size, size))
+    start = 0
+    for block in tableBlocks(g.func, members, rows):
+        table[start:start + len(block)] = block
+        start += len(block)
+    table.flush()
+    del table
+    return members
+
+
+# Yields the operation table of `func` over `members` in blocks of at most
+# `rows` rows, as int64 NumPy arrays. The blocks are evaluated in int64 if
+# no subexpression of func can overflow it (see fitsInt64), and with Python
+# integers otherwise, raising ValueError if an entry does not fit in int64.
+def tableBlocks(func, members, rows):
+    exact = len(members) > 0 and not fitsInt64(func, int(members.min()), int(members.max()))
+    for start in range(0, len(members), rows):
+        xs = members[start:start + rows, None]
+        ys = members[None, :]
+        xs, ys = np.broadcast_arrays(xs, ys)
+        if not exact:
+            yield np.asarray(evalArray(func, xs, ys), dtype=np.int64)
+            continue
+        block = evalArray(func, xs.astype(object), ys.astype(object))
+        if np.any((block < INT64_MIN) | (block > INT64_MAX)):
+            raise LazyError("!!! The operation table of ", func,
+                            " has entries that do not fit in 64-bit integers !!!")
+        yield np.asarray(block, dtype=np.int64)
@@ -0,0 +1,234 @@
+from groups import *
+
+
+# Representation of a family of algebraic groups whose condition and
+# operation may contain an integer parameter k, e.g.
+# Family(Equal(Mod(x, k), 0), Add(x, y)) describes the groups
+# Group(Equal(Mod(x, n), 0), Add(x, y)) for each integer n.
+#
+# Work that does not depend on k (associativity, and solving for the
+# identity and inverse of an operation that does not contain k) is done
+# once for the whole family rather than once per value of k. Closure and
+# the membership of the identity are derived as conditions on k when
+# possible (see closureCondition and identityCondition), and evaluated for
+# all values of k at once. The remaining checks (closure of other
+# families, and the inverse) are made for each value of k.
+class Family:
+    def __init__(self, cond, func):
+        self.cond = cond.simplify()
+        self.func = func.simplify()
+
+    def __str__(self):
+        return "c(x, k) = " + str(self.cond) + ", f(x, y, k) = " + str(self.func)
+
+    # Returns the condition and function of the group obtained by replacing
+    # k with the given number.
+    def instance(self, value):
+        evalParam = EvalParam(value)
+        cond = evalParam.transform(self.cond).simplify()
+        func = evalParam.transform(self.func).simplify()
+        return cond, func
+
+    # If the identity of the operation does not depend on k, identityCondition
+    # returns (e, cond(e), True), where e is the identity element (or None if
+    # the operation has no identity) and cond(e) is the condition on k under
+    # which e is a member of the set. For example, for the family
+    # Family(Geq(x, k), Add(x, y)), identityCondition returns
+    # (0, k <= 0, True). Otherwise, it returns (None, Empty(), False).
+    def identityCondition(self):
+        if hasParam(self.func):
+            return None, Empty(), False
+        identity, identityExists = solveIdentity(self.func)
+        if not identityExists:
+            return None, Empty(), True
+        return identity, EvalIdentity(identity).transform(self.cond).simplify(), True
+
+    # If the closure of the family can be decided symbolically,
+    # closureCondition returns (closed(k), valid(k), True), where for every
+    # k such that valid(k) holds, the group is closed if and only if
+    # closed(k) holds. Otherwise, it returns (Empty(), Empty(), False).
+    #
+    # This is the case for an affine operation αx + βy + γ without k, and
+    # the conditions x >= k, x > k, x <= k, x < k, and x % k == r:
+    # 1. The set [b, ∞) is closed if and only if f is not decreasing in x
+    #    or y and f(b, b) >= b, i.e. (α + β - 1)b + γ >= 0, and:
+    # 2. The residue class x % k == r (valid for k > r) is closed if and
+    #    only if f(r, r) == (α + β - 1)r + γ + r is congruent to r.
+    # For example, for Family(Geq(x, k), Add(x, y)), closureCondition
+    # returns (k >= 0, True, True).
+    def closureCondition(self):
+        if hasParam(self.func):
+            return Empty(), Empty(), False
+        (alpha, beta, gamma), isAffine = getAffine(self.func)
+        if not isAffine or not isinstance(self.cond, BinaryCondition):
+            return Empty(), Empty(), False
+        scale = alpha + beta - 1
+
+        left, right = self.cond.left, self.cond.right
+        kind = type(self.cond)
+        if isinstance(left, K) and isinstance(right, X):
+            flipped = {Geq: Leq, Greater: Less, Leq: Geq, Less: Greater, Equal: Equal}
+            left, right, kind = right, left, flipped[kind]
+        if isinstance(left, X) and isinstance(right, K):
+            if kind == Equal:
+                return Empty(), Empty(), False
+            if alpha < 0 or beta < 0:
+                return Empty(), All(), True
+            bounds = {Geq: K(), Greater: Add(K(), 1), Leq: K(), Less: Sub(K(), 1)}
+            offset = Add(Mult(scale, bounds[kind]), gamma)
+            if kind == Geq or kind == Greater:
+                return Geq(offset, 0).simplify(), All(), True
+            return Leq(offset, 0).simplify(), All(), True
+
+        r, rConst = right.eval()
+        if kind == Equal and isinstance(left, Mod) and isinstance(left.left, X) and \
+                isinstance(left.right, K) and rConst and int(r) == r and r >= 0:
+            return Equal(Mod(Num(scale * int(r) + gamma), K()), 0).simplify(), Greater(K(), int(r)), True
+        return Empty(), Empty(), False
+
+    # Given a list of integers `values`, check returns a map from the name
+    # of each group axiom ("closure", "associativity", "identity", "inverse")
+    # to the list of values of k for which the axiom holds, along with the
+    # list of values for which all axioms hold ("group").
+    def check(self, values):
+        result = {"closure": [], "associativity": [],
+                  "identity": [], "inverse": [], "group": []}
+
+        # Associativity only depends on the operation.
+        funcHasParam = hasParam(self.func)
+        assoc = funcHasParam or checkAssoc(self.func)
+
+        # The identity only depends on the operation; its membership in the
+        # set is decided for all values at once by the condition on k.
+        identity, identityCond, identityDecided = self.identityCondition()
+        identityValues = []
+        if identityDecided:
+            identityValues = evalParamCondition(identityCond, values)
+
+        # Closure is decided for all values at once where closureCondition
+        # applies (closed(k) is only evaluated where valid(k) holds, since it
+        # may contain % k).
+        closedCond, closedValid, closureDecided = self.closureCondition()
+        closedValues = {}
+        if closureDecided:
+            validValues = evalParamCondition(closedValid, values)
+            decidable = [v for v, valid in zip(values, validValues) if valid]
+            closedValues = dict(zip(decidable, evalParamCondition(closedCond, decidable)))
+
+        for index, value in enumerate(values):
+            cond, func = self.instance(value)
+            if value in closedValues:
+                closed = closedValues[value]
+            else:
+                closed = checkClosure(cond, func)
+            if funcHasParam:
+                assoc = checkAssoc(func)
+            if identityDecided:
+                identityExists = identity is not None and identityValues[index]
+                valueIdentity = identity
+            else:
+                valueIdentity, identityExists = checkIdentity(cond, func)
+            inverseExists = False
+            if identityExists:
+                inverse, inverseExists = checkInverse(
+                    cond, func, valueIdentity)
+
+            if closed:
+                result["closure"].append(value)
+            if assoc:
+                result["associativity"].append(value)
+            if identityExists:
+                result["identity"].append(value)
+            if inverseExists:
+                result["inverse"].append(value)
+            if closed and assoc and identityExists and inverseExists:
+                result["group"].append(value)
+        return result
+
+
+# Returns true if the given integer function or boolean condition contains
+# the parameter k.
+def hasParam(expr):
+    find = FindParam()
+    find.transform(expr)
+    return find.found
+
+
+# Given a boolean condition `cond(k)` that only depends on k and a list of
+# integers `values`, evalParamCondition returns the list of booleans
+# cond(values[i]). If NumPy is available, the condition is evaluated for
+# all values at once. The condition is false for the values of k for which
+# it is undefined (e.g. k = 0 in 0 % k == 0).
+def evalParamCondition(cond, values):
+    if hasNumpy():
+        asX = ParamToX().transform(cond)
+        try:
+            return list(evalConditionArray(asX, np.array(values, dtype=object)))
+        except ZeroDivisionError:
+            pass
+    return [evalParamValue(cond, value) for value in values]
+
+
+# Returns cond(value) for a boolean condition `cond(k)`, or false if it is
+# undefined for k = value.
+def evalParamValue(cond, value):
+    try:
+        return EvalParam(value).transform(cond).simplify().eval()
+    except ZeroDivisionError:
+        return False
+
+
+# Replace k with the given number.
+class EvalParam(TreeTransform):
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+    def transformK(self, expr):
+        return Num(self.value)
+
+
+# Replace k with x, so that a condition on k can be evaluated like a
+# condition on x.
+class ParamToX(TreeTransform):
+    def __init__(self):
+        super().__init__()
+
+    def transformK(self, expr):
+        return X()
+
+
+# Records whether an expression contains k.
+class FindParam(TreeTransform):
+    def __init__(self):
+        super().__init__()
+        self.found = False
+
+    def transformK(self, expr):
+        self.found = True
+        return K()
+
+
+def main():
+    print("\n\n\n------- MAIN ------")
+    families = [
+        Family(Geq(x, k), Add(x, y)),
+        Family(Equal(Mod(x, k), 0), Add(x, y)),
+        Family(All(), Add(Add(x, y), k)),
+        Family(Equal(Mod(x, k), 1), Sub(Add(x, y), 1)),
+        Family(Leq(x, k), Add(Add(x, y), 2)),
+    ]
+    for family in families:
+        print("\n---", family, "---")
+        identity, identityCond, identityDecided = family.identityCondition()
+        if identityDecided:
+            print("identity", identity, "is a member when", identityCond)
+        closedCond, closedValid, closureDecided = family.closureCondition()
+        if closureDecided:
+            print("closed when", closedCond, "for", closedValid)
+        for axiom, values in family.check(list(range(1, 11))).items():
+            print(axiom + ":", values)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+from closure import *
+from vectorize import *
+
+
+# Given a boolean expression `cond(x)` and an integer function `f(x, y)`,
+# if `cond` describes a finite set of at most FINITE_LIMIT integers,
+# buildCayleyTable returns (table, True), where table is a CayleyTable
+# containing f(x, y) for every pair of members x and y.
+# Otherwise (or if NumPy is not available), it returns (None, False).
+def buildCayleyTable(cond, func):
+    if not hasNumpy():
+        return None, False
+    members, isFinite = getFiniteMembers(cond)
+    if not isFinite:
+        return None, False
+    return CayleyTable(members, func), True
+
+
+# Given a boolean expression `cond(x)`, if `cond` describes a finite set of
+# at most FINITE_LIMIT integers, getFiniteMembers returns (members, True),
+# where members is a sorted NumPy array of the integers in the set.
+# Otherwise, it returns (None, False).
+def getFiniteMembers(cond):
+    candidates = []
+    total = 0
+    for bottom, top in getAllowedRanges(cond):
+        if bottom <= BOTTOM or top >= TOP:
+            return None, False
+        if top < bottom:
+            continue
+        total += top - bottom + 1
+        if total > FINITE_LIMIT:
+            return None, False
+        candidates.append(np.arange(bottom, top + 1, dtype=np.int64))
+    if len(candidates) == 0:
+        return np.array([], dtype=np.int64), True
+    candidates = np.unique(np.concatenate(candidates))
+    mask = evalConditionArray(cond, candidates.astype(object))
+    return candidates[mask], True
+
+
+# The operation table of an integer function f(x, y) over a finite set of
+# members. The group axioms are decided exactly by inspecting the table.
+# Entries of the table are stored as indices into `members`, so that
+# table[i][j] == k means f(members[i], members[j]) == members[k].
+class CayleyTable:
+    def __init__(self, members, func):
+        self.members = members
+        self.size = len(members)
+        self.closed = True
+        self.table = np.zeros((self.size, self.size), dtype=np.int64)
+        if self.size == 0:
+            return
+        xs, ys = np.meshgrid(members.astype(object),
+                             members.astype(object), indexing="ij")
+        try:
+            values = evalArray(func, xs, ys)
+        except ZeroDivisionError:
+            self.closed = False
+            return
+        values = np.asarray(values, dtype=object)
+        indices = np.searchsorted(members.astype(object), values)
+        indices = np.minimum(indices, self.size - 1)
+        self.closed = bool(np.all(members[indices] == values))
+        if self.closed:
+            self.table = indices.astype(np.int64)
+
+    # Returns true if f(x, y) is a member for all members x and y.
+    def isClosed(self):
+        return self.closed
+
+    # Returns true if f(f(a, b), c) == f(a, f(b, c)) for all members a, b,
+    # and c. The n^3 comparisons are made in chunks of rows of a so that the
+    # intermediate arrays stay small. If the table is symmetric, only the
+    # triples with a <= c are compared (see symmetry.py): the columns c
+    # before the first row of a chunk are skipped.
+    def isAssociative(self):
+        n = self.size
+        if n == 0:
+            return True
+        commutative = np.array_equal(self.table, self.table.T)
+        chunk = max(1, ASSOC_CHUNK // (n * n))
+        for start in range(0, n, chunk):
+            first = start if commutative else 0
+            rows = self.table[start:start + chunk]
+            left = self.table[:, first:][rows]
+            right = np.take(rows, self.table[:, first:], axis=1)
+            if not np.array_equal(left, right):
+                return False
+        return True
+
+    # If there is a member e such that f(x, e) == f(e, x) == x for all
+    # members x, getIdentity returns (Num(e), True).
+    # Otherwise, it returns (Num(0), False).
+    def getIdentity(self):
+        n = self.size
+        if n == 0:
+            return Num(0), False
+        indices = np.arange(n)
+        rows = np.all(self.table == indices[None, :], axis=1)
+        cols = np.all(self.table == indices[:, None], axis=0)
+        candidates = np.nonzero(rows & cols)[0]
+        if len(candidates) == 0:
+            return Num(0), False
+        return Num(int(self.members[candidates[0]])), True
+
+    # Given the identity element, if every member x has a member y such
+    # that f(x, y) == f(y, x) == identity, getInverse returns (inverse, True),
+    # where inverse is an expression of x (see fitInverse), or a
+    # TableFunction if no expression is found. Otherwise, it returns
+    # (Num(0), False).
+    def getInverse(self, identity):
+        e = int(np.searchsorted(self.members, identity.value))
+        isIdentity = (self.table == e) & (self.table.T == e)
+        if not np.all(np.any(isIdentity, axis=1)):
+            return Num(0), False
+        inverses = self.members[np.argmax(isIdentity, axis=1)]
+        members = [int(m) for m in self.members]
+        values = [int(v) for v in inverses]
+        inverse, found = fitInverse(members, values)
+        if found:
+            return inverse, True
+        return TableFunction(dict(zip(members, values))), True
+
+
+# Given the lists of members and of their inverses, fitInverse returns
+# (e, True) for an expression e of x such that e(members[i]) == values[i]
+# for every i, or (Num(0), False) if there is none among:
+# 1. αx + β, for α in {1, -1}, and:
+# 2. (αx + β) % m, for α in {1, -1}, 0 <= β < m, and m the number of
+#    members or the largest member plus one (as in the integers modulo m).
+def fitInverse(members, values):
+    for alpha in [1, -1]:
+        beta = values[0] - alpha * members[0]
+        if all(alpha * m + beta == v for m, v in zip(members, values)):
+            return Add(Mult(alpha, x), beta).simplify(), True
+    for modulus in sorted(set([len(members), members[-1] + 1])):
+        if modulus <= 0:
+            continue
+        for alpha in [1, -1]:
+            for beta in range(modulus):
+                if all((alpha * m + beta) % modulus == v for m, v in zip(members, values)):
+                    return Mod(Add(Mult(alpha, x), beta), modulus).simplify(), True
+    return Num(0), False
+
+
+# A function of x given by its values on a finite set of members, for
+# inverses that fitInverse cannot express.
+class TableFunction:
+    def __init__(self, values):
+        self.values = values
+
+    def __str__(self):
+        entries = [str(k) + " -> " + str(v) for k, v in list(self.values.items())[:TABLE_PREVIEW]]
+        if len(self.values) > TABLE_PREVIEW:
+            entries.append("...")
+        return "table(" + ", ".join(entries) + ")"
+
+    # Returns the value of the function for the member n.
+    def eval(self, n):
+        return self.values[n]
@@ -1,5 +1,7 @@
 from enum import IntEnum
 from functools import cmp_to_key
+from limits import *
+from render import *
 
 # Convenient shorthands that allow consumers to create integer functions
 # using these variable names rather than calling N(), X(), or Y()
@@ -9,18 +11,30 @@ y = "should_create_y"
 a = "should_create_a"
 b = "should_create_b"
 c = "should_create_c"
+# Shorthand for the integer parameter k of a family of groups
+k = "should_create_k"
 
 # Different kinds of integer expressions
 MathKind = IntEnum(
-    'MathKind', 'Mult Add Sub Div Mod Minus A B C X Y Num BinaryMath Math')
+    'MathKind', 'Mult Add Sub Div Mod Minus A B C X Y K Num BinaryMath Math')
 
 
 # Represents a mathematical function that returns an integer.
 # Specific kinds of functions should inherit from Math.
+# Attributes that are the same for every node of a kind (kind, wrapParens)
+# are class attributes, and every class declares __slots__ so that nodes
+# do not carry a per-instance __dict__.
+#
+# The string representation of a node is rendered by render.py from the
+# pieces() of the node, and is cached in strCache.
 class Math:
+    __slots__ = ('strCache',)
+    kind = MathKind.Math
+    wrapParens = False
+
     def __init__(self):
-        self.kind = MathKind.Math
-        self.wrapParens = False
+        countNode()
+        self.strCache = None
 
     def convert(self, expr):
         if isinstance(expr, int):
@@ -35,6 +49,8 @@ class Math:
             return X()
         elif expr == y:
             return Y()
+        elif expr == k:
+            return K()
         elif isinstance(expr, Math):
             return expr
         else:
@@ -42,15 +58,22 @@ class Math:
                              "is not a number, variable, or mathematical expression")
 
     def __str__(self):
-        return "Math"
+        return render(self)
+
+    # Returns a list of strings and (child, wrapped) pairs that make up the
+    # string representation of this expression (see render.py).
+    def pieces(self):
+        return ["Math"]
+
+    # Returns true if this expression must be wrapped in parentheses when it
+    # is the operand of another expression.
+    def needsParens(self):
+        return self.wrapParens
 
     # Returns a string representation that wraps this expression in parentheses
     # if necessary. This allows string representations such as (x + y) * z.
     def wrap(self):
-        if self.wrapParens:
-            return "(" + str(self) + ")"
-        else:
-            return str(self)
+        return renderWrapped(self)
 
     # Returns the integer value of this expression (if there is one).
     def eval(self):
@@ -75,7 +98,7 @@ class Math:
         else:
             return 0, self, False
 
-    # Returns true if this expression is a variable (A, B, C, X, or Y).
+    # Returns true if this expression is a variable (A, B, C, X, Y, or K).
     def isVariable(self):
         return False
 
@@ -84,6 +107,12 @@ class Math:
     def getVariableName(self):
         return ""
 
+    # Returns a hashable value that identifies the structure of this
+    # expression. Two expressions have equal keys if and only if they
+    # are the same tree.
+    def key(self):
+        return (int(self.kind),)
+
     # Returns an integer indicating the lexicographic comparison of this
     # expression with the given other expression.
     def compare(self, other):
@@ -122,10 +151,12 @@ class Math:
 
 # Binary integer functions of the form e1 op e2, where op is +, *, - or /.
 class BinaryMath(Math):
+    __slots__ = ('left', 'right')
+    kind = MathKind.BinaryMath
+    wrapParens = True
+
     def __init__(self, left, right):
         super().__init__()
-        self.kind = MathKind.BinaryMath
-        self.wrapParens = True
         self.left = self.convert(left)
         self.right = self.convert(right)
 
@@ -144,11 +175,12 @@ class BinaryMath(Math):
         leftVal, leftExists = self.left.eval()
         if leftExists:
             rightVal, rightExists = self.right.eval()
-            return self.func(leftVal, rightVal), leftExists and rightExists
-        else:
-            return 0, False
+            if rightExists:
+                return self.func(leftVal, rightVal), True
+        return 0, False
 
     # Returns a simplified version of this function using mathematical rules.
+    @limited
     def simplify(self):
         val, valExists = self.eval()
         if valExists:
@@ -158,6 +190,9 @@ class BinaryMath(Math):
         res = self.make(l, r)
         return res
 
+    def key(self):
+        return (int(self.kind), self.left.key(), self.right.key())
+
     # Returns an integer comparing this function to the given other function.
     def compare(self, other):
         cmp = super().compare(other)
@@ -173,12 +208,11 @@ class BinaryMath(Math):
 
 # (Int, Int) -> Int
 class Add(BinaryMath):
-    def __init__(self, left, right):
-        super().__init__(left, right)
-        self.kind = MathKind.Add
+    __slots__ = ()
+    kind = MathKind.Add
 
-    def __str__(self):
-        return self.left.wrap() + " + " + self.right.wrap()
+    def pieces(self):
+        return [(self.left, True), " + ", (self.right, True)]
 
     # To evaluate an addition operator given two numbers x and y, add x and y.
     def func(self, x, y):
@@ -224,11 +258,12 @@ class Add(BinaryMath):
 
             def mycompare(item1, item2):
                 return item1.compare(item2)
-            mylist = sorted(l + r, key=cmp_to_key(mycompare))
+            mylist = sorted(countTerms(l + r), key=cmp_to_key(mycompare))
             result = []
             skipIndices = []
             idx = 0
             while idx < len(mylist):
+                checkpoint()
                 elt = mylist[idx]
                 if idx in skipIndices:
                     idx += 1
@@ -263,17 +298,16 @@ class Add(BinaryMath):
                     result.append(term)
                 idx += 1
             result = sorted(result, key=cmp_to_key(mycompare))
-            return result
+            return countTerms(result)
 
 
 # (Int, Int) -> Int
 class Sub(BinaryMath):
-    def __init__(self, left, right):
-        super().__init__(left, right)
-        self.kind = MathKind.Sub
+    __slots__ = ()
+    kind = MathKind.Sub
 
-    def __str__(self):
-        return self.left.wrap() + " - " + self.right.wrap()
+    def pieces(self):
+        return [(self.left, True), " - ", (self.right, True)]
 
     def func(self, x, y):
         return x - y
@@ -286,29 +320,23 @@ class Sub(BinaryMath):
 
 # (Int, Int) -> Int
 class Mult(BinaryMath):
-    def __init__(self, left, right):
-        super().__init__(left, right)
-        self.kind = MathKind.Mult
+    __slots__ = ()
+    kind = MathKind.Mult
 
-    def __str__(self):
-        l = self.left.wrap()
-        r = self.right.wrap()
-        lVar, lExists = self.left.eval()
-        if lExists:
-            return l + r
-        elif self.left.isVariable() and self.right.isVariable():
-            return l + r
-        else:
-            return l + " * " + r
+    # Products of a constant and an expression, or of two variables, are
+    # written without an operator, e.g. 2x or xy.
+    def isJuxtaposed(self):
+        if isinstance(self.left, Num) or self.left.eval()[1]:
+            return True
+        return self.left.isVariable() and self.right.isVariable()
 
-    def wrap(self):
-        lVar, lExists = self.left.eval()
-        if lExists:
-            return str(self)
-        elif self.left.isVariable() and self.right.isVariable():
-            return str(self)
-        else:
-            return "(" + str(self) + ")"
+    def pieces(self):
+        if self.isJuxtaposed():
+            return [(self.left, True), (self.right, True)]
+        return [(self.left, True), " * ", (self.right, True)]
+
+    def needsParens(self):
+        return not self.isJuxtaposed()
 
     def getCoeff(self):
         lVal, lExists = self.left.eval()
@@ -356,6 +384,7 @@ class Mult(BinaryMath):
         l = rest
         r = Num(val)
 
+    @limited
     def simpHelper(self, l, r):
         # Transform (e * a) * b to e * c, where c is a * b
         if isinstance(l, Mult):
@@ -453,20 +482,16 @@ class Mult(BinaryMath):
 
             def mycompare(item1, item2):
                 return item1.compare(item2)
-            mylist = sorted(l + r, key=cmp_to_key(mycompare))
-            return mylist
+            return sorted(countTerms(l + r), key=cmp_to_key(mycompare))
 
 
 # (Int, Int) -> Int
 class Div(BinaryMath):
-    def __init__(self, left, right):
-        super().__init__(left, right)
-        self.kind = MathKind.Div
+    __slots__ = ()
+    kind = MathKind.Div
 
-    def __str__(self):
-        l = self.left.wrap()
-        r = self.right.wrap()
-        return l + " / " + r
+    def pieces(self):
+        return [(self.left, True), " / ", (self.right, True)]
 
     def getVariableName(self):
         rVal, rExists = self.right.eval()
@@ -486,14 +511,11 @@ class Div(BinaryMath):
 
 # (Int, Int) -> Int
 class Mod(BinaryMath):
-    def __init__(self, left, right):
-        super().__init__(left, right)
-        self.kind = MathKind.Mod
+    __slots__ = ()
+    kind = MathKind.Mod
 
-    def __str__(self):
-        l = self.left.wrap()
-        r = self.right.wrap()
-        return l + " % " + r
+    def pieces(self):
+        return [(self.left, True), " % ", (self.right, True)]
 
     def func(self, x, y):
         return x % y
@@ -504,13 +526,15 @@ class Mod(BinaryMath):
 
 # Int -> Int
 class Minus(Math):
+    __slots__ = ('child',)
+    kind = MathKind.Minus
+
     def __init__(self, child):
         super().__init__()
-        self.kind = MathKind.Minus
         self.child = self.convert(child)
 
-    def __str__(self):
-        return "-" + self.child.wrap()
+    def pieces(self):
+        return ["-", (self.child, True)]
 
     def func(self, x, y):
         return -x
@@ -532,9 +556,13 @@ class Minus(Math):
     def getVariableName(self):
         return self.child.getVariableName()
 
+    def key(self):
+        return (int(self.kind), self.child.key())
+
     def make(self, left, right):
         return Minus(left)
 
+    @limited
     def simplify(self):
         c = self.child.simplify()
         cVal, cExists = c.eval()
@@ -549,99 +577,96 @@ class Minus(Math):
         return Minus(c)
 
 
-# Int
-class A(Math):
-    def __init__(self):
-        super().__init__()
-        self.kind = MathKind.A
-
-    def __str__(self):
-        return "a"
+# Base class of the variables a, b, c, x, y, and k.
+# Variables carry no state, so each variable class has a single shared
+# instance: calling A() always returns the same object.
+class Variable(Math):
+    __slots__ = ()
+    name = ""
 
-    def getVariableName(self):
-        return "a"
+    def __new__(cls):
+        instance = cls.__dict__.get("instance")
+        if instance is None:
+            instance = super().__new__(cls)
+            instance.strCache = None
+            cls.instance = instance
+        return instance
 
-    def isVariable(self):
-        return True
-
-
-# Int
-class B(Math):
     def __init__(self):
-        super().__init__()
-        self.kind = MathKind.B
+        pass
 
-    def __str__(self):
-        return "b"
+    def pieces(self):
+        return [self.name]
 
     def getVariableName(self):
-        return "b"
+        return self.name
 
     def isVariable(self):
         return True
 
 
 # Int
-class C(Math):
-    def __init__(self):
-        super().__init__()
-        self.kind = MathKind.C
+class A(Variable):
+    __slots__ = ()
+    kind = MathKind.A
+    name = "a"
 
-    def __str__(self):
-        return "c"
-
-    def getVariableName(self):
-        return "c"
 
-    def isVariable(self):
-        return True
+# Int
+class B(Variable):
+    __slots__ = ()
+    kind = MathKind.B
+    name = "b"
 
 
 # Int
-class X(Math):
-    def __init__(self):
-        super().__init__()
-        self.kind = MathKind.X
+class C(Variable):
+    __slots__ = ()
+    kind = MathKind.C
+    name = "c"
 
-    def __str__(self):
-        return "x"
-
-    def getVariableName(self):
-        return "x"
 
-    def isVariable(self):
-        return True
+# Int
+class X(Variable):
+    __slots__ = ()
+    kind = MathKind.X
+    name = "x"
 
 
 # Int
-class Y(Math):
-    def __init__(self):
-        super().__init__()
-        self.kind = MathKind.Y
+class Y(Variable):
+    __slots__ = ()
+    kind = MathKind.Y
+    name = "y"
 
-    def __str__(self):
-        return "y"
 
-    def getVariableName(self):
-        return "y"
-
-    def isVariable(self):
-        return True
+# Int
+# An integer parameter that is constant within a single group, but varies
+# across a family of groups (see family.py).
+class K(Variable):
+    __slots__ = ()
+    kind = MathKind.K
+    name = "k"
 
 
 # Int
 class Num(Math):
+    __slots__ = ('value',)
+    kind = MathKind.Num
+
     def __init__(self, value):
         super().__init__()
-        self.kind = MathKind.Num
         self.value = value
 
-    def __str__(self):
-        return str(self.value)
+    def pieces(self):
+        return [str(self.value)]
 
     def eval(self):
         return self.value, True
 
+    def key(self):
+        return (int(self.kind), self.value)
+
     def compare(self, other):
         kindCompare = super().compare(other)
         if kindCompare != 0:
@@ -1,45 +1,164 @@
+import io
+
 from conditions import *
 from closure import *
 from assoc import *
 from identity import *
 from inverse import *
+from finite import *
+from affine import *
+from transport import *
+from normalize import *
+from presburger import *
 
 
 # Representation of an algebraic group consisting of:
 # 1. An Int -> Bool function that describes the members of the group, and:
 # 2. An (Int, Int) -> Int function that describes the operation on group members.
+#
+# The condition is normalized into a canonical union of cells (see
+# normalize.py) before any axiom is checked.
+#
+# If `finite` is true and the condition describes a finite set of at most
+# FINITE_LIMIT integers, the group axioms are decided exactly using the
+# operation table of the function. Otherwise, they are checked symbolically.
 class Group:
-    def __init__(self, cond, func):
-        self.cond = cond.simplify()
+    def __init__(self, cond, func, finite=True):
+        self.cond = normalize(cond)
         self.func = func.simplify()
+        self.finite = finite
         self.identity = None
         self.inverse = None
+        # A counterexample (x, y, f(x, y)) to closure, if one was found.
+        self.witness = None
 
     def __str__(self):
-        return "c(x) = " + str(self.cond) + ", f(x, y) = " + str(self.func)
+        out = io.StringIO()
+        out.write("c(x) = ")
+        writeNode(out, self.cond, False)
+        out.write(", f(x, y) = ")
+        writeNode(out, self.func, False)
+        return out.getvalue()
 
     def pretty(self):
-        return "{\n  condition(x) = " + str(self.cond) + "\n  function(x, y) = " + str(self.func) + "\n  identity = " + str(self.identity) + "\n  inverse(x) = " + str(self.inverse) + "\n}"
+        out = io.StringIO()
+        out.write("{\n  condition(x) = ")
+        writeNode(out, self.cond, False)
+        out.write("\n  function(x, y) = ")
+        writeNode(out, self.func, False)
+        out.write("\n  identity = " + str(self.identity))
+        out.write("\n  inverse(x) = " + str(self.inverse))
+        out.write("\n}")
+        return out.getvalue()
 
     def isGroup(self):
-        closed = checkClosure(self.cond, self.func)
+        result, reason = self.check()
+        if not result:
+            print(reason)
+        return result
+
+    # Checks the group axioms without printing anything.
+    # Returns (True, "") if this is a group, (False, reason) if it is not,
+    # where reason describes the first axiom that does not hold, or
+    # (None, reason) if an axiom could not be decided.
+    def check(self):
+        if self.finite:
+            table, isFinite = buildCayleyTable(self.cond, self.func)
+            if isFinite:
+                return self.checkFinite(table)
+        coefficients, isAffine = getAffine(self.func)
+        if isAffine:
+            return self.checkAffine(*coefficients)
+        conjugation, isConjugate = getMultTransport(self.func)
+        if isConjugate:
+            result, reason, self.identity, self.inverse = checkMultTransport(
+                self.cond, self.func, *conjugation)
+            return result, reason
+        closed, self.witness = checkClosureWitness(self.cond, self.func)
+        if closed is None:
+            return None, "closure unknown"
         if not closed:
-            print("not closed")
-            return False
-        assoc = checkAssoc(self.func)
+            return False, "not closed"
+        assoc, assocDecided = decideAssoc(self.func)
+        if not assocDecided:
+            return None, "associativity unknown"
         if not assoc:
-            print("not associative")
-            return False
+            return False, "not associative"
         self.identity, identityExists = checkIdentity(self.cond, self.func)
+        if identityExists is None:
+            return None, "identity unknown"
         if not identityExists:
-            print("no identity element")
-            return False
+            return False, "no identity element"
         self.inverse, inverseExists = checkInverse(
             self.cond, self.func, self.identity)
+        if inverseExists is None:
+            return None, "inverse unknown"
+        if not inverseExists:
+            return False, "no inverse"
+        return True, ""
+
+    # Decides the group axioms using the operation table of the function
+    # over the (finite) members of the condition.
+    def checkFinite(self, table):
+        if not table.isClosed():
+            return False, "not closed"
+        if not table.isAssociative():
+            return False, "not associative"
+        self.identity, identityExists = table.getIdentity()
+        if not identityExists:
+            return False, "no identity element"
+        self.inverse, inverseExists = table.getInverse(self.identity)
         if not inverseExists:
-            print("no inverse")
-            return False
-        return True
+            return False, "no inverse"
+        return True, ""
+
+    # Decides the group axioms for the affine operation αx + βy + γ in closed
+    # form (see affine.py). Operations other than x + y + γ are associative
+    # only in degenerate cases, for which the identity and the inverse are
+    # left to the general checks.
+    def checkAffine(self, alpha, beta, gamma):
+        closed, self.witness = isAffineClosed(self.cond, alpha, beta, gamma)
+        if not closed:
+            return False, "not closed"
+        if not isAffineAssociative(alpha, beta, gamma):
+            return False, "not associative"
+        if alpha != 1 or beta != 1:
+            self.identity, identityExists = checkIdentity(self.cond, self.func)
+            if identityExists is None:
+                return None, "identity unknown"
+            if not identityExists:
+                return False, "no identity element"
+            self.inverse, inverseExists = checkInverse(
+                self.cond, self.func, self.identity)
+            if inverseExists is None:
+                return None, "inverse unknown"
+            if not inverseExists:
+                return False, "no inverse"
+            return True, ""
+        if not self.cond.contains(-gamma):
+            self.identity = Num(0)
+            return False, "no identity element"
+        self.identity = Num(-gamma)
+        if not isAffineClosed(self.cond, -1, 0, -2 * gamma)[0]:
+            self.inverse = Num(0)
+            return False, "no inverse"
+        self.inverse = affineInverse(gamma)
+        return True, ""
+
+
+# Returns (closed, witness), where closed is true if the condition
+# `cond(x)` is closed under the affine operation αx + βy + γ, deciding it
+# exactly (see presburger.py) if possible, or with checkAffineClosure
+# otherwise. If it is decided that `cond` is not closed, witness is a
+# counterexample (x, y, f(x, y)). Otherwise, it is None.
+def isAffineClosed(cond, alpha, beta, gamma):
+    pair, decided = findLinearCounterexample(cond, alpha, beta, gamma)
+    if decided:
+        if pair is None:
+            return True, None
+        x, y = pair
+        return False, (x, y, alpha * x + beta * y + gamma)
+    return checkAffineClosure(cond, alpha, beta, gamma), None
 
 
 def testGroup(g):
@@ -55,6 +174,7 @@ def main():
     # Groups
     testGroup(Group(All(), Add(x, y)))
     testGroup(Group(Equal(Mod(x, 2), 0), Add(x, y)))
+    testGroup(Group(Equal(Mod(x, 7), x), Mod(Add(x, y), 7)))
     # Not closed
     testGroup(Group(Greater(Mod(x, 4), 1), Add(x, y)))
     testGroup(Group(Geq(x, -3), Add(x, y)))
@@ -62,6 +182,7 @@ def main():
     # Not associative
     testGroup(Group(All(), Sub(x, y)))
     testGroup(Group(All(), Add(Mult(2, x), y)))
+    testGroup(Group(Equal(Mod(x, 5), x), Mod(Sub(x, y), 5)))
     # No identity
     testGroup(Group(Geq(x, 5), Add(x, y)))
     testGroup(Group(Greater(x, 1), Mult(x, y)))
@@ -1,13 +1,42 @@
 from conditions import *
 from treetransform import *
+from cache import *
+
+# The identity candidate only depends on the operation, so it is cached by
+# the key of the operation.
+identityCache = Cache("identity")
 
 
 # Given a boolean expression `cond(x)` and an integer function `f(x, y`),
 # if there exists an integer-constant expression e that such that:
 # 1. cond(e) == True, and:
 # 2. f(x, e) == f(e, x) == x for all x,
-# then checkIdentity returns (e, True). Otherwise, it returns (Num(0), False).
+# then checkIdentity returns (e, True). Otherwise, it returns (Num(0), False),
+# or (Num(0), None) if the search for an identity is inconclusive (see
+# search.py).
 def checkIdentity(cond, func):
+    identity, identityExists = solveIdentity(func)
+    if identityExists:
+        # Check if the proposed identity (Num expression) fulfills the condition.
+        # For example, if the condition is x >= 0 && x % 2 == 1, and the proposed
+        # identity is 1, 1 >= 0 && 1 % 2 == 1 is true, so 1 is a member.
+        if cond.contains(identity.value):
+            return identity, True
+        return Num(0), False
+    # The operation could not be solved for an identity, so look for one
+    # among the small members (see search.py).
+    from search import searchIdentity
+    return searchIdentity(cond, func)
+
+
+# Given an integer function `f(x, y)`, if there exists an integer constant e
+# such that f(x, e) == f(e, x) == x for all x, solveIdentity returns
+# (Num(e), True). Otherwise, it returns (Num(0), False).
+def solveIdentity(func):
+    result, cached = identityCache.get(func.key())
+    if cached:
+        return result
+
     fBA = EvalA_B(b, a).transform(func)
     testBA = Equal(fBA, B()).simplify()
     fAB = EvalA_B(a, b).transform(func)
@@ -16,20 +45,11 @@ def checkIdentity(cond, func):
     solvedBA, existsBA = testBA.solve()
     solvedAB, existsAB = testAB.solve()
 
+    result = (Num(0), False)
     if existsBA and existsAB:
         if isinstance(solvedBA.right, Num) and isinstance(solvedAB.right, Num) and solvedBA.right.value == solvedAB.right.value:
-            identity = solvedBA.right
-            # Check if the proposed identity (Num expression) fulfills the condition:
-            # If we replace x with the identity and evaluate the condition,
-            # the boolean result must be true.
-            # For example, if the condition is x >= 0 && x % 2 == 1, and the proposed
-            # identity is 1, evaluating 1 >= 0 && 1 % 2 == 1 results in true.
-            c = EvalIdentity(identity).transform(cond)
-            c = c.simplify()
-            isInGroup = c.eval()
-            if c.eval():
-                return identity, True
-    return Num(0), False
+            result = (solvedBA.right, True)
+    return identityCache.put(func.key(), result)
 
 
 # Replace x with a and y with b.
@@ -1,6 +1,11 @@
 from conditions import *
 from treetransform import *
 from closure import *
+from cache import *
+
+# The inverse candidate only depends on the operation and the identity, so
+# it is cached by both.
+inverseCache = Cache("inverse")
 
 
 # Given a boolean expression cond(x), an integer function f(x, y), and an
@@ -8,9 +13,32 @@ from closure import *
 # an integer function g(a) such that:
 # 1. cond(g(a)) == True, and:
 # 2. f(a, g(a)) == f(g(a), a) == a
-# then checkInverse return (g, True). Otherwise, it returns (Num(0), False).
+# then checkInverse return (g, True). Otherwise, it returns (Num(0), False),
+# or (Num(0), None) if the search for an inverse is inconclusive (see
+# search.py).
 def checkInverse(cond, func, identity):
     c = cond.simplify()
+    inverse, inverseExists = solveInverse(func, identity)
+    if inverseExists and checkClosure(c, inverse):
+        return PrettyInverse().transform(inverse), True
+    if not inverseExists:
+        # The operation could not be solved for an inverse, so fit one
+        # through the inverses of a few small members (see search.py).
+        from search import searchInverse
+        return searchInverse(c, func, identity)
+    return Num(0), False
+
+
+# Given an integer function f(x, y) and an integer-constant expression
+# `identity`, if for each integer y there exists an integer function g(y)
+# such that f(y, g(y)) == f(g(y), y) == identity, solveInverse returns
+# (g, True). Otherwise, it returns (Num(0), False).
+def solveInverse(func, identity):
+    cacheKey = (func.key(), identity.key())
+    result, cached = inverseCache.get(cacheKey)
+    if cached:
+        return result
+
     f = func.simplify()
     fBA = EvalTwoExprs(B(), A()).transform(f).simplify()
     testBA = Equal(fBA, identity).simplify()
@@ -20,12 +48,10 @@ def checkInverse(cond, func, identity):
     solvedBA, existsBA = testBA.solve()
     solvedAB, existsAB = testAB.solve()
 
+    result = (Num(0), False)
     if existsBA and existsAB and solvedBA.right.compare(solvedAB.right) == 0:
-        inverse = EvalInverse().transform(solvedBA.right)
-        if checkClosure(c, inverse):
-            return PrettyInverse().transform(inverse), True
-
-    return Num(0), False
+        result = (EvalInverse().transform(solvedBA.right), True)
+    return inverseCache.put(cacheKey, result)
 
 
 # Replace b with y.
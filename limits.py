@@ -0,0 +1,150 @@
+import functools
+import threading
+import time
+
+
+# Raised at a cancellation point when the current check has run past its
+# deadline.
+class CheckTimeout(Exception):
+    pass
+
+
+# Raised at a cancellation point when the current check has been cancelled.
+class CheckCancelled(Exception):
+    pass
+
+
+# Raised when the current check exceeds one of the limits of its Budget.
+class BudgetExceeded(Exception):
+    pass
+
+
+# Resource limits of a single group check. Each limit may be None, in which
+# case it is not enforced.
+# - maxNodes: the maximum number of expression nodes allocated by the check.
+# - maxTerms: the maximum number of terms in a single flattened expression.
+# - maxDepth: the maximum nesting depth of simplify and transform calls.
+class Budget:
+    def __init__(self, maxNodes=None, maxTerms=None, maxDepth=None):
+        self.maxNodes = maxNodes
+        self.maxTerms = maxTerms
+        self.maxDepth = maxDepth
+
+
+# The deadline, cancellation flag and resource budget of a single group
+# check. Long-running loops (simplify, flatten, and tree transforms) call
+# checkpoint(), which raises CheckTimeout or CheckCancelled as soon as the
+# token of the running check has expired or has been cancelled, and the
+# node, term, and depth counters raise BudgetExceeded when a limit of the
+# budget is reached.
+class CheckToken:
+    def __init__(self, timeout=None, budget=None):
+        self.deadline = None
+        if timeout is not None:
+            self.deadline = time.monotonic() + timeout
+        self.cancelled = False
+        self.budget = budget
+        if budget is None:
+            self.budget = Budget()
+        self.nodes = 0
+        self.depth = 0
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        if self.cancelled:
+            raise CheckCancelled()
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise CheckTimeout()
+
+    def countNode(self):
+        self.nodes += 1
+        maxNodes = self.budget.maxNodes
+        if maxNodes is not None and self.nodes > maxNodes:
+            raise BudgetExceeded("more than " + str(maxNodes) + " nodes")
+
+    def countTerms(self, terms):
+        maxTerms = self.budget.maxTerms
+        if maxTerms is not None and terms > maxTerms:
+            raise BudgetExceeded("more than " + str(maxTerms) + " terms")
+
+    def enter(self):
+        self.check()
+        self.depth += 1
+        maxDepth = self.budget.maxDepth
+        if maxDepth is not None and self.depth > maxDepth:
+            raise BudgetExceeded("deeper than " + str(maxDepth) + " levels")
+
+    def leave(self):
+        self.depth -= 1
+
+
+# The token of the check running on the current thread (if any).
+class ActiveToken(threading.local):
+    token = None
+
+
+activeToken = ActiveToken()
+
+
+# Cancellation point: raises if the check running on the current thread
+# has expired or has been cancelled.
+def checkpoint():
+    token = activeToken.token
+    if token is not None:
+        token.check()
+
+
+# Counts the allocation of an expression node against the budget of the
+# check running on the current thread.
+def countNode():
+    token = activeToken.token
+    if token is not None:
+        token.countNode()
+
+
+# Counts the terms of a flattened expression against the budget of the
+# check running on the current thread.
+def countTerms(terms):
+    token = activeToken.token
+    if token is not None:
+        token.countTerms(len(terms))
+    return terms
+
+
+# Counts the `count` terms produced so far by a loop that builds a
+# flattened expression against the budget of the check running on the
+# current thread, so that the budget is exceeded as soon as too many terms
+# are produced rather than once the whole expression has been built.
+def countTermsSoFar(count):
+    token = activeToken.token
+    if token is not None:
+        token.countTerms(count)
+
+
+# Decorator for recursive methods such as simplify and transform: each call
+# is a cancellation point and counts as one level of depth against the
+# budget of the check running on the current thread.
+def limited(method):
+    @functools.wraps(method)
+    def wrapper(*args):
+        token = activeToken.token
+        if token is None:
+            return method(*args)
+        token.enter()
+        try:
+            return method(*args)
+        finally:
+            token.leave()
+    return wrapper
+
+
+# Calls fn(*args) with `token` as the token of the running check.
+def runWithToken(token, fn, *args):
+    previous = activeToken.token
+    activeToken.token = token
+    try:
+        return fn(*args)
+    finally:
+        activeToken.token = previous
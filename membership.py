@@ -0,0 +1,323 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from math import gcd
+
+from closure import *
+from normalize import *
+from vectorize import *
+
+# Membership indexes are cached by the key of their condition.
+membershipCache = Cache("membership")
+
+
+# Returns the (cached) Membership index of the boolean condition `cond(x)`.
+def getMembership(cond):
+    index, cached = membershipCache.get(cond.key())
+    if cached:
+        return index
+    return membershipCache.put(cond.key(), Membership(cond))
+
+
+# A fast membership test for the set described by a boolean condition.
+#
+# The set is described by cells: ranges [bottom, top] and the residues
+# x % n allowed for each modulus n, stored as bitsets. If the condition can
+# be normalized (see normalize.getSegments), its cells are the disjoint
+# segments of its members and are exact. Otherwise, the condition is split
+# into its disjuncts (cond.flatten()), and each disjunct gives cells (see
+# disjunctCells) that may overlap, and that fall back to a compiled Python
+# predicate of the condition unless they are exact.
+#
+# The line is cut at the bounds of the cells, and each piece lists the
+# cells that cover it, so that a number is tested by binary search for its
+# piece and then only by the cells of that piece.
+class Membership:
+    def __init__(self, cond):
+        self.cond = cond
+        self.cells = conditionCells(cond)
+        self.bottoms, self.tops = mergeRanges(
+            [(cell[0], cell[1]) for cell in self.cells])
+        self.pieceBottoms, self.pieceCells = pieceIndex(self.cells)
+        self.predicate = compileCondition(cond)
+
+    # Returns true if the integer n is a member of the set.
+    def contains(self, n):
+        index = bisect_right(self.pieceBottoms, n) - 1
+        needsPredicate = False
+        for residues, exact in self.pieceCells[index]:
+            if not all((bits >> (n % modulus)) & 1 for modulus, bits in residues.items()):
+                continue
+            if exact:
+                return True
+            needsPredicate = True
+        return needsPredicate and self.predicate(n)
+
+    # Given a NumPy array of integers, returns the boolean array of whether
+    # each integer is a member of the set.
+    def containsMany(self, values):
+        values = np.asarray(values)
+        result = np.zeros(values.shape, dtype=bool)
+        unknown = np.zeros(values.shape, dtype=bool)
+        for bottom, top, residues, exact in self.cells:
+            mask = (values >= arrayBound(bottom)) & (values <= arrayBound(top))
+            for modulus, bits in residues.items():
+                allowed = np.array([(bits >> r) & 1 == 1 for r in range(modulus)])
+                mask &= allowed[np.mod(values, modulus)]
+            if exact:
+                result |= mask
+            else:
+                unknown |= mask
+        unknown &= ~result
+        if np.any(unknown):
+            candidates = values[unknown].astype(object)
+            result[unknown] = evalConditionArray(self.cond, candidates)
+        return result
+
+
+    # Yields the members x of the set with lo <= x <= hi in increasing order.
+    # Within each cell, members are found by stepping through the residue
+    # classes allowed by the cell rather than testing every integer, and
+    # the gaps between the ranges of the cells are skipped entirely.
+    def members(self, lo, hi=TOP):
+        streams = [self.cellMembers(cell, lo, hi) for cell in self.cells]
+        last = None
+        for n in heapq.merge(*streams):
+            if n != last:
+                last = n
+                yield n
+
+    # Yields the members of a single cell with lo <= x <= hi in increasing
+    # order.
+    def cellMembers(self, cell, lo, hi):
+        bottom, top, residues, exact = cell
+        start = max(lo, bottom)
+        end = min(hi, top)
+        period, allowed = combineResidues(residues)
+        base = start - start % period
+        while base <= end:
+            for r in allowed:
+                n = base + r
+                if n < start:
+                    continue
+                if n > end:
+                    return
+                if exact or self.predicate(n):
+                    yield n
+            base += period
+
+    # Yields the members x of the set with lo <= x <= hi in increasing order,
+    # as NumPy arrays. Each array holds the members of a window of
+    # `chunkSize` consecutive integers; windows outside the ranges of the
+    # cells are skipped, and empty windows are not yielded.
+    def memberChunks(self, lo, hi, chunkSize):
+        start = lo
+        while start <= hi:
+            # Jump to the next merged range that contains members.
+            index = bisect_right(self.bottoms, start) - 1
+            if index < 0 or start > self.tops[index]:
+                index += 1
+                if index >= len(self.bottoms):
+                    return
+                start = self.bottoms[index]
+                if start > hi:
+                    return
+            end = min(hi, start + chunkSize - 1)
+            chunk = self.windowMembers(start, end)
+            if len(chunk) > 0:
+                yield chunk
+            start = end + 1
+
+    # Returns the sorted NumPy array of members x with start <= x <= end.
+    def windowMembers(self, start, end):
+        found = []
+        for bottom, top, residues, exact in self.cells:
+            cellStart = max(start, bottom)
+            cellEnd = min(end, top)
+            if cellStart > cellEnd:
+                continue
+            period, allowed = combineResidues(residues)
+            base = cellStart - cellStart % period
+            bases = np.arange(base, cellEnd + 1, period, dtype=np.int64)
+            candidates = (bases[:, None] + np.array(allowed, dtype=np.int64)[None, :]).ravel()
+            candidates = candidates[(candidates >= cellStart) & (candidates <= cellEnd)]
+            if not exact and len(candidates) > 0:
+                candidates = candidates[evalConditionArray(self.cond, candidates.astype(object))]
+            found.append(candidates)
+        if len(found) == 0:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+
+# Returns the list of cells (bottom, top, residues, exact) of the boolean
+# condition `cond(x)`. The cells are disjoint and sorted if `cond` can be
+# normalized, and otherwise are the cells of its disjuncts.
+def conditionCells(cond):
+    try:
+        segments, normalizable = getSegments(cond)
+    except LazyError:
+        normalizable = False
+    if normalizable:
+        return [(bottom, top, {modulus: mask}, True)
+                for bottom, top, modulus, mask in segments]
+    cells = []
+    for elt in cond.flatten():
+        cells.extend(disjunctCells(elt))
+    return cells
+
+
+# Cuts the line into pieces at the bounds of the cells. Returns (bottoms,
+# pieces), where bottoms is the sorted list of the lowest numbers of the
+# pieces, starting with BOTTOM, and pieces[i] is the list of (residues,
+# exact) of the cells that cover the piece starting at bottoms[i].
+def pieceIndex(cells):
+    cuts = set()
+    for bottom, top, residues, exact in cells:
+        if not isInfinite(bottom):
+            cuts.add(bottom)
+        if not isInfinite(top):
+            cuts.add(top + 1)
+    bottoms = [BOTTOM] + sorted(cuts)
+    pieces = [[] for _ in bottoms]
+    for bottom, top, residues, exact in cells:
+        start = 0 if isInfinite(bottom) else bisect_left(bottoms, bottom)
+        end = len(bottoms) if isInfinite(top) else bisect_left(bottoms, top + 1)
+        for index in range(start, end):
+            checkpoint()
+            pieces[index].append((residues, exact))
+    return bottoms, pieces
+
+
+# Returns the list of cells (bottom, top, residues, exact) of the boolean
+# condition `elt(x)`, which must not contain any disjunctions.
+# If `elt` is fully described by its range and residues (see isIndexed),
+# its cells are computed exactly by normalize.toCells, so that terms that
+# contradict each other give no cells. Otherwise, the cell is only a
+# superset of `elt` (from the closure analysis, or every integer if the
+# analysis fails), and its members are tested with the compiled predicate.
+def disjunctCells(elt):
+    if isinstance(elt, Empty):
+        return []
+    if isIndexed(elt):
+        cells, exact = toCells(elt)
+        if exact:
+            return [(bottom, top, {modulus: mask}, True)
+                    for bottom, top, modulus, mask in cells
+                    if bottom <= top and mask != 0]
+    try:
+        bottom = getBottom(elt)
+        top = getTop(elt)
+        modVals = getModVals(elt)
+    except LazyError:
+        return [(BOTTOM, TOP, {}, False)]
+    if bottom > top:
+        return []
+    residues = {}
+    for modulus, vals in modVals.items():
+        bits = 0
+        for val in vals:
+            bits |= 1 << val
+        residues[modulus] = bits
+    return [(bottom, top, residues, False)]
+
+
+# Returns the bound b as a number that can be compared with NumPy arrays.
+def arrayBound(b):
+    if isInfinite(b):
+        return float(b.sign) * float("inf")
+    return b
+
+
+# Given a map of residue bitsets n => bits (bit r is set if x % n == r is
+# allowed), combineResidues returns (period, allowed), where period is the
+# least common multiple of the moduli and allowed is the sorted list of
+# residues x % period that are allowed by every modulus.
+# If the period would exceed RESIDUE_PERIOD_LIMIT, the residues are not
+# combined and (1, [0]) is returned, so that every integer is a candidate.
+def combineResidues(residues):
+    period = 1
+    for modulus in residues:
+        period = period * modulus // gcd(period, modulus)
+        if period > RESIDUE_PERIOD_LIMIT:
+            return 1, [0]
+    allowed = [r for r in range(period)
+               if all((bits >> (r % modulus)) & 1 for modulus, bits in residues.items())]
+    return period, allowed
+
+
+# Returns true if the boolean condition `cond(x)`, which must not contain
+# any disjunctions, is fully described by its range and residues, i.e.
+# each of its terms is of the form x OP c, x % n OP c, or x % n == x.
+def isIndexed(cond):
+    if isinstance(cond, All):
+        return True
+    elif isinstance(cond, And):
+        return isIndexed(cond.left) and isIndexed(cond.right)
+    elif isinstance(cond, BinaryCondition):
+        if isinstance(cond.left, X) and cond.right.eval()[1]:
+            return not isinstance(cond, Equal) or isinstance(cond.right.eval()[0], int)
+        if getModIJ(cond)[2]:
+            return isinstance(cond, Equal) or isinstance(cond, Greater) or \
+                isinstance(cond, Geq) or isinstance(cond, Less) or isinstance(cond, Leq)
+        return getModSelfBound(cond)[1]
+    return False
+
+
+# Given a list of ranges, mergeRanges returns the sorted lists of bottoms
+# and tops of the disjoint ranges that cover the same integers.
+def mergeRanges(ranges):
+    bottoms = []
+    tops = []
+    for bottom, top in sorted(ranges):
+        if len(tops) > 0 and bottom <= tops[-1] + 1:
+            tops[-1] = max(tops[-1], top)
+        else:
+            bottoms.append(bottom)
+            tops.append(top)
+    return bottoms, tops
+
+
+# Compiles the boolean condition `cond(x)` into a Python function of x.
+def compileCondition(cond):
+    return eval("lambda x: " + conditionSource(cond))
+
+
+# Returns Python source code that evaluates the boolean condition `cond(x)`.
+def conditionSource(cond):
+    if isinstance(cond, All):
+        return "True"
+    elif isinstance(cond, Empty):
+        return "False"
+    elif isinstance(cond, And):
+        return "(" + conditionSource(cond.left) + " and " + conditionSource(cond.right) + ")"
+    elif isinstance(cond, Or):
+        return "(" + conditionSource(cond.left) + " or " + conditionSource(cond.right) + ")"
+    elif isinstance(cond, BinaryCondition):
+        operators = {Equal: " == ", Greater: " > ",
+                     Geq: " >= ", Less: " < ", Leq: " <= "}
+        return "(" + mathSource(cond.left) + operators[type(cond)] + mathSource(cond.right) + ")"
+    else:
+        raise LazyError("!!! Cannot compile condition ", cond, " !!!")
+
+
+# Compiles the integer function `f(x, y)` into a Python function of x and y.
+def compileOperation(f):
+    return eval("lambda x, y: " + mathSource(f))
+
+
+# Returns Python source code that evaluates the integer function
+# `expr(x)` (or `expr(x, y)`).
+def mathSource(expr):
+    if isinstance(expr, X):
+        return "x"
+    elif isinstance(expr, Y):
+        return "y"
+    elif isinstance(expr, Num):
+        return "(" + repr(expr.value) + ")"
+    elif isinstance(expr, Minus):
+        return "(-" + mathSource(expr.child) + ")"
+    elif isinstance(expr, BinaryMath):
+        operators = {Add: " + ", Sub: " - ",
+                     Mult: " * ", Div: " / ", Mod: " % "}
+        return "(" + mathSource(expr.left) + operators[type(expr)] + mathSource(expr.right) + ")"
+    else:
+        raise LazyError("!!! Cannot compile expression ", expr, " !!!")
@@ -0,0 +1,238 @@
+from math import gcd
+
+from closure import *
+
+
+# Normalization of boolean conditions into a canonical union of cells.
+#
+# A cell is the set of integers x with bottom <= x <= top and x % n in a
+# range [r_1, r_2] of residues. normalize rewrites a condition built from
+# comparisons of x (or x % n) with constants, &&, and || as the sorted
+# union of disjoint cells:
+# 1. The line is cut into segments at every bound of the condition, and
+#    each segment is given the residues, modulo the least common multiple
+#    of the moduli of the condition, that are members on it, and:
+# 2. The residues of each segment are reduced to their smallest period,
+#    and neighboring segments with the same residues are merged, and:
+# 3. Each segment becomes one cell per run of consecutive residues, with
+#    bounds tightened to its first and last members.
+# For example, x > 3 && x > 5 becomes x >= 6, x < 0 && x > 0 becomes
+# Empty(), and x % 2 == 0 || x % 2 == 1 becomes All().
+#
+# Conditions that are not built this way, or whose moduli have a least
+# common multiple above RESIDUE_PERIOD_LIMIT, are left unchanged.
+
+
+# Returns the normalized form of the boolean condition `cond(x)`.
+def normalize(cond):
+    c = cond.simplify()
+    segments, normalizable = getSegments(c)
+    if not normalizable:
+        return c
+    return fromSegments(segments)
+
+
+# Returns (segments, True), where segments are the disjoint segments (in
+# the format of toSegments) of the members of the boolean condition
+# `cond(x)`, or ([], False) if `cond` cannot be normalized.
+def getSegments(cond):
+    cells, normalizable = toCells(cond)
+    if not normalizable:
+        return [], False
+    period = 1
+    for bottom, top, modulus, mask in cells:
+        period = period * modulus // gcd(period, modulus)
+        if period > RESIDUE_PERIOD_LIMIT:
+            return [], False
+    return toSegments(cells, period), True
+
+
+# Given a boolean condition `cond(x)`, returns (cells, True), where cells is
+# a list of (bottom, top, modulus, mask) such that x is a member if and only
+# if bottom <= x <= top and bit x % modulus of mask is set for some cell.
+# If `cond` cannot be described this way, returns ([], False).
+def toCells(cond):
+    if isinstance(cond, All):
+        return [(BOTTOM, TOP, 1, 1)], True
+    elif isinstance(cond, Empty):
+        return [], True
+    elif isinstance(cond, Or):
+        l, lExists = toCells(cond.left)
+        r, rExists = toCells(cond.right)
+        return countTerms(l + r), lExists and rExists
+    elif isinstance(cond, And):
+        l, lExists = toCells(cond.left)
+        r, rExists = toCells(cond.right)
+        if not lExists or not rExists:
+            return [], False
+        cells = []
+        for lCell in l:
+            for rCell in r:
+                checkpoint()
+                countTermsSoFar(len(cells) + 1)
+                cells.append(intersectCells(lCell, rCell))
+        return cells, True
+    elif not isinstance(cond, BinaryCondition):
+        return [], False
+
+    n, selfBound = getModSelfBound(cond)
+    if selfBound:
+        return [(0, n - 1, 1, 1)], True
+    i, j, modExists = getModIJ(cond)
+    if modExists:
+        if int(i) != i or int(j) != j:
+            return [], False
+        residues = {Equal: range(j, j + 1), Greater: range(j + 1, i),
+                    Geq: range(j, i), Less: range(0, j), Leq: range(0, j + 1)}
+        mask = 0
+        for r in residues[type(cond)]:
+            mask |= 1 << r
+        return [(BOTTOM, TOP, int(i), mask)], True
+    c = getRHSConst(cond, None)
+    if not isinstance(cond.left, X) or c is None or int(c) != c:
+        return [], False
+    c = int(c)
+    bounds = {Equal: (c, c), Greater: (c + 1, TOP), Geq: (c, TOP),
+              Less: (BOTTOM, c - 1), Leq: (BOTTOM, c)}
+    bottom, top = bounds[type(cond)]
+    return [(bottom, top, 1, 1)], True
+
+
+# Returns the cell of the numbers that are members of both cells l and r.
+def intersectCells(l, r):
+    modulus = l[2] * r[2] // gcd(l[2], r[2])
+    mask = liftMask(l[3], l[2], modulus) & liftMask(r[3], r[2], modulus)
+    return (max(l[0], r[0]), min(l[1], r[1]), modulus, mask)
+
+
+# Returns the mask of the residues modulo `period` (a multiple of
+# `modulus`) that are congruent to a residue of `mask` modulo `modulus`.
+def liftMask(mask, modulus, period):
+    # Multiplying by 1 + 2^m + 2^2m + ... repeats the m bits of the mask.
+    return mask * (((1 << period) - 1) // ((1 << modulus) - 1))
+
+
+# Returns the smallest divisor d of `period` such that the residues of
+# `mask` modulo `period` are the residues of a mask modulo d, and that mask.
+def reduceMask(mask, period):
+    for d in range(1, period + 1):
+        if period % d == 0:
+            small = mask & ((1 << d) - 1)
+            if liftMask(small, d, period) == mask:
+                return d, small
+    return period, mask
+
+
+# Cuts the line into segments at the bounds of the cells. Returns the list
+# of (bottom, top, modulus, mask) of the segments with at least one member,
+# where neighboring segments with the same residues are merged.
+def toSegments(cells, period):
+    cuts = set()
+    for bottom, top, modulus, mask in cells:
+        if bottom <= top:
+            if not isInfinite(bottom):
+                cuts.add(bottom)
+            if not isInfinite(top):
+                cuts.add(top + 1)
+    points = [BOTTOM] + sorted(cuts) + [TOP]
+
+    segments = []
+    for index in range(len(points) - 1):
+        checkpoint()
+        bottom = points[index]
+        top = points[index + 1] - 1 if index + 1 < len(points) - 1 else TOP
+        mask = 0
+        for cell in cells:
+            if cell[0] <= bottom and top <= cell[1]:
+                mask |= liftMask(cell[3], cell[2], period)
+        modulus, mask = reduceMask(mask, period)
+        if mask == 0:
+            continue
+        if len(segments) > 0:
+            last = segments[-1]
+            if last[1] + 1 == bottom and last[2] == modulus and last[3] == mask:
+                segments[-1] = (last[0], top, modulus, mask)
+                continue
+        segments.append((bottom, top, modulus, mask))
+    return segments
+
+
+# Converts the list of segments returned by toSegments into a condition.
+def fromSegments(segments):
+    cells = []
+    for bottom, top, modulus, mask in segments:
+        for first, last in residueRuns(mask, modulus):
+            b = tightenBottom(bottom, modulus, first, last)
+            t = tightenTop(top, modulus, first, last)
+            if b <= t:
+                cells.append(cellCondition(b, t, modulus, first, last))
+    if len(cells) == 0:
+        return Empty()
+    result = cells[0]
+    for cell in cells[1:]:
+        result = Or(result, cell)
+    return result
+
+
+# Returns the list of the runs [first, last] of consecutive residues of
+# `mask` modulo `modulus`.
+def residueRuns(mask, modulus):
+    runs = []
+    r = 0
+    while r < modulus:
+        if mask & (1 << r):
+            first = r
+            while r + 1 < modulus and mask & (1 << (r + 1)):
+                r += 1
+            runs.append((first, r))
+        r += 1
+    return runs
+
+
+# Returns the smallest x >= bottom with first <= x % modulus <= last.
+def tightenBottom(bottom, modulus, first, last):
+    if isInfinite(bottom):
+        return bottom
+    r = bottom % modulus
+    if r < first:
+        return bottom + first - r
+    if r > last:
+        return bottom + modulus - r + first
+    return bottom
+
+
+# Returns the largest x <= top with first <= x % modulus <= last.
+def tightenTop(top, modulus, first, last):
+    if isInfinite(top):
+        return top
+    r = top % modulus
+    if r > last:
+        return top - (r - last)
+    if r < first:
+        return top - r - (modulus - last)
+    return top
+
+
+# Returns the condition bottom <= x <= top && first <= x % modulus <= last.
+def cellCondition(bottom, top, modulus, first, last):
+    if bottom == top:
+        return Equal(x, bottom)
+    parts = []
+    if not isInfinite(bottom):
+        parts.append(Geq(x, bottom))
+    if not isInfinite(top):
+        parts.append(Leq(x, top))
+    if modulus > 1:
+        if first == last:
+            parts.append(Equal(Mod(x, modulus), first))
+        else:
+            if first > 0:
+                parts.append(Geq(Mod(x, modulus), first))
+            if last < modulus - 1:
+                parts.append(Leq(Mod(x, modulus), last))
+    if len(parts) == 0:
+        return All()
+    result = parts[0]
+    for part in parts[1:]:
+        result = And(result, part)
+    return result
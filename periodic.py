@@ -0,0 +1,122 @@
+from math import gcd
+
+from vectorize import *
+from solver import *
+from abstract import *
+
+
+# Associativity of operations that contain % by constants.
+#
+# Such operations are not polynomials, so the simplifier cannot prove them
+# associative. But if every modulus is a constant, f is quasi-affine: there
+# are integers α, β, and L such that f(x, y) == αx + βy + p(x % L, y % L)
+# for some function p, where L is the least common multiple of the moduli.
+# Then f(f(a, b), c) - f(a, f(b, c)) only depends on the residues of a, b,
+# and c modulo L, plus the terms (α² - α)a and (β - β²)c. So f is
+# associative if and only if α and β are 0 or 1 and f is associative on
+# every triple of residues in [0, L - 1], which is checked with a single
+# vectorized evaluation per residue of a.
+
+
+# If the integer function `f(x, y)` is quasi-affine, getPeriodicStructure
+# returns ((α, β, L), True). Otherwise, it returns ((0, 0, 0), False).
+def getPeriodicStructure(f):
+    val, exists = f.eval()
+    if exists:
+        if int(val) != val:
+            return (0, 0, 0), False
+        return (0, 0, 1), True
+    if isinstance(f, X):
+        return (1, 0, 1), True
+    elif isinstance(f, Y):
+        return (0, 1, 1), True
+    elif isinstance(f, Minus):
+        (a, b, period), ok = getPeriodicStructure(f.child)
+        return (-a, -b, period), ok
+    elif not isinstance(f, BinaryMath):
+        return (0, 0, 0), False
+
+    if isinstance(f, Mod):
+        # e % n is periodic for a constant n if e is quasi-affine with
+        # period L, since adding a multiple of lcm(L, n) to x or y adds a
+        # multiple of n to e, or if e is a polynomial with integer
+        # coefficients, since adding n to x or y adds a multiple of n to e.
+        n, nConst = f.right.eval()
+        if not nConst or n == 0 or int(n) != n:
+            return (0, 0, 0), False
+        (la, lb, lPeriod), lOk = getPeriodicStructure(f.left)
+        if lOk:
+            return (0, 0, lcm(lPeriod, abs(int(n)))), True
+        poly, isPolynomial = toPolynomial(f.left)
+        if isPolynomial:
+            return (0, 0, abs(int(n))), True
+        return (0, 0, 0), False
+
+    (la, lb, lPeriod), lOk = getPeriodicStructure(f.left)
+    (ra, rb, rPeriod), rOk = getPeriodicStructure(f.right)
+    if not lOk or not rOk:
+        return (0, 0, 0), False
+    period = lcm(lPeriod, rPeriod)
+    if isinstance(f, Add):
+        return (la + ra, lb + rb, period), True
+    elif isinstance(f, Sub):
+        return (la - ra, lb - rb, period), True
+    elif isinstance(f, Mult):
+        # A product is quasi-affine if one side is constant, or if both
+        # sides are periodic.
+        lVal, lConst = f.left.eval()
+        rVal, rConst = f.right.eval()
+        if lConst:
+            return (lVal * ra, lVal * rb, rPeriod), True
+        elif rConst:
+            return (la * rVal, lb * rVal, lPeriod), True
+        elif la == lb == ra == rb == 0:
+            return (0, 0, period), True
+    return (0, 0, 0), False
+
+
+# Given a quasi-affine function `f(x, y)` with the structure (α, β, L),
+# checkPeriodicAssoc returns (assoc, True) where assoc is true if and only
+# if f is associative, or (False, False) if it cannot be checked (because
+# NumPy is not available or L is larger than `periodLimit`, which defaults
+# to PERIODIC_ASSOC_LIMIT).
+# If `commutative` is true, only the triples (a, b, c) with a <= c are
+# checked (see symmetry.py).
+# The grid is evaluated in int64 if no subexpression can overflow (see
+# fitsPeriodGrid), and with Python integers otherwise.
+def checkPeriodicAssoc(f, alpha, beta, period, commutative=False, periodLimit=None):
+    if periodLimit is None:
+        periodLimit = PERIODIC_ASSOC_LIMIT
+    if alpha not in [0, 1] or beta not in [0, 1]:
+        return False, True
+    if not hasNumpy() or period > periodLimit:
+        return False, False
+    dtype = np.int64 if fitsPeriodGrid(f, period) else object
+    residues = np.arange(period, dtype=np.int64).astype(dtype)
+    bs, cs = np.meshgrid(residues, residues, indexing="ij")
+    fBC = evalArray(f, bs, cs)
+    for a in range(period):
+        checkpoint()
+        first = a if commutative else 0
+        as_ = np.full(bs[:, first:].shape, a, dtype=dtype)
+        left = evalArray(f, evalArray(f, as_, bs[:, first:]), cs[:, first:])
+        right = evalArray(f, as_, fBC[:, first:])
+        if not np.array_equal(left, right):
+            return False, True
+    return True, True
+
+
+# Returns true if f(f(a, b), c) and f(a, f(b, c)) can be evaluated in int64
+# for a, b, and c in [0, period), i.e. if no subexpression of f overflows
+# when x and y are in [0, period) or are values of f on that grid.
+def fitsPeriodGrid(f, period):
+    lo, hi = 0, period - 1
+    for bottom, top in analyze(f, [IntervalDomain([(lo, hi)])])[0]:
+        lo = min(lo, bottom)
+        hi = max(hi, top)
+    return fitsInt64(f, lo, hi)
+
+
+# Returns the least common multiple of the positive integers a and b.
+def lcm(a, b):
+    return a * b // gcd(a, b)
@@ -0,0 +1,180 @@
+import time
+
+from normalize import *
+from affine import *
+from periodic import *
+
+
+# An exact decision procedure for the closure of linear operations
+# f(x, y) = αx + βy + γ over conditions that normalize.py can describe as
+# unions of cells (intervals intersected with residue classes).
+#
+# S is closed under f if and only if there are no members x and y of S such
+# that f(x, y) is in the complement of S, which is also a union of cells.
+# For each cell A of x, cell B of y, and cell C of the complement, with L
+# the least common multiple of their moduli:
+# 1. The residues rx and ry of x and y modulo L are enumerated, keeping
+#    those allowed by A and B for which f(rx, ry) % L is allowed by C, and:
+# 2. Writing x = rx + Ls and y = ry + Lu, the bounds of A, B, and C become
+#    bounds on s, u, and w = αs + βu, and the existence of integers s and u
+#    within these bounds is decided exactly (see findLinearPoint).
+# This is a special case of quantifier elimination for linear integer
+# arithmetic with divisibility constraints, as in Cooper's method.
+
+
+# Given a boolean condition `cond(x)` and the affine operation αx + βy + γ,
+# returns ((x, y), True) for members x and y such that f(x, y) is not a
+# member, or (None, True) if there are none. If `cond` cannot be described
+# by cells, or deciding would take more than PRESBURGER_LIMIT steps,
+# returns (None, False).
+def findLinearCounterexample(cond, alpha, beta, gamma):
+    inside, normalizable = getSegments(cond.simplify())
+    if not normalizable:
+        return None, False
+    outside = complementSegments(inside)
+
+    steps = 0
+    for a in inside:
+        for b in inside:
+            for target in outside:
+                modulus = lcm(lcm(a[2], b[2]), target[2])
+                steps += modulus * modulus
+                if steps > PRESBURGER_LIMIT:
+                    return None, False
+    for a in inside:
+        for b in inside:
+            for target in outside:
+                checkpoint()
+                witness = findCellCounterexample(a, b, target, alpha, beta, gamma)
+                if witness is not None:
+                    return witness, True
+    return None, True
+
+
+# Returns (x, y) for x in the cell a and y in the cell b such that
+# αx + βy + γ is in the cell `target`, or None if there are none.
+def findCellCounterexample(a, b, target, alpha, beta, gamma):
+    modulus = lcm(lcm(a[2], b[2]), target[2])
+    xResidues = [r for r in range(modulus) if a[3] & (1 << (r % a[2]))]
+    yResidues = [r for r in range(modulus) if b[3] & (1 << (r % b[2]))]
+    for rx in xResidues:
+        for ry in yResidues:
+            base = alpha * rx + beta * ry + gamma
+            if not target[3] & (1 << (base % target[2])):
+                continue
+            sBox = stepBounds(a[0], a[1], rx, modulus)
+            uBox = stepBounds(b[0], b[1], ry, modulus)
+            wBox = stepBounds(target[0], target[1], base, modulus)
+            point = findLinearPoint(alpha, beta, sBox, uBox, wBox)
+            if point is not None:
+                s, u = point
+                return rx + modulus * s, ry + modulus * u
+    return None
+
+
+# Returns the range of the integers s such that bottom <= r + Ls <= top.
+def stepBounds(bottom, top, r, modulus):
+    return divideBounds(bottom - r, modulus, True), divideBounds(top - r, modulus, False)
+
+
+# Returns integers (s, u) in the ranges sBox and uBox such that αs + βu is
+# in the range wBox, or None if there are none.
+def findLinearPoint(alpha, beta, sBox, uBox, wBox):
+    if sBox[0] > sBox[1] or uBox[0] > uBox[1] or wBox[0] > wBox[1]:
+        return None
+    # Make both coefficients nonnegative by negating s or u.
+    if alpha < 0:
+        point = findLinearPoint(-alpha, beta, (-sBox[1], -sBox[0]), uBox, wBox)
+        return None if point is None else (-point[0], point[1])
+    if beta < 0:
+        point = findLinearPoint(alpha, -beta, sBox, (-uBox[1], -uBox[0]), wBox)
+        return None if point is None else (point[0], -point[1])
+    # Make sure that β > 0 by swapping s and u.
+    if beta == 0:
+        if alpha == 0:
+            if wBox[0] <= 0 <= wBox[1]:
+                return pickInRange(sBox), pickInRange(uBox)
+            return None
+        point = findLinearPoint(beta, alpha, uBox, sBox, wBox)
+        return None if point is None else (point[1], point[0])
+
+    # For a given s, there is a u if and only if some multiple βu with u in
+    # uBox is in [w_0 - αs, w_1 - αs]. The bounds on u are linear in s,
+    # and whether [w_0 - αs, w_1 - αs] contains a multiple of β only
+    # depends on s modulo β, so only β consecutive values of s are tried.
+    if alpha == 0:
+        candidates = [pickInRange(sBox)]
+    else:
+        lo = max(sBox[0], divideBounds(wBox[0] - beta * uBox[1], alpha, True))
+        hi = min(sBox[1], divideBounds(wBox[1] - beta * uBox[0], alpha, False))
+        if lo > hi:
+            return None
+        if not isInfinite(lo):
+            candidates = range(lo, int(min(hi, lo + beta - 1)) + 1)
+        elif not isInfinite(hi):
+            candidates = range(hi - beta + 1, hi + 1)
+        else:
+            candidates = range(0, beta)
+    for s in candidates:
+        uLo = max(uBox[0], divideBounds(wBox[0] - alpha * s, beta, True))
+        uHi = min(uBox[1], divideBounds(wBox[1] - alpha * s, beta, False))
+        if uLo <= uHi:
+            return s, pickInRange((uLo, uHi))
+    return None
+
+
+# Returns an integer in the nonempty range r.
+def pickInRange(r):
+    if not isInfinite(r[0]):
+        return r[0]
+    if not isInfinite(r[1]):
+        return r[1]
+    return 0
+
+
+# Returns the segments (in the format of toSegments) of the numbers that are
+# not in the given segments.
+def complementSegments(segments):
+    result = []
+    lowest = BOTTOM
+    for bottom, top, modulus, mask in segments:
+        if bottom > lowest:
+            result.append((lowest, bottom - 1, 1, 1))
+        rest = ~mask & ((1 << modulus) - 1)
+        if rest != 0:
+            result.append((bottom, top, modulus, rest))
+        lowest = top + 1
+    if lowest < TOP or len(segments) == 0:
+        result.append((lowest, TOP, 1, 1))
+    return result
+
+
+def main():
+    print("\n\n\n------- MAIN ------")
+    candidates = [
+        (Or(Equal(Mod(x, 2), 0), Greater(x, 10)), Add(x, y)),
+        (Equal(Mod(x, 2), 0), Add(x, y)),
+        (Equal(Mod(x, 3), 1), Sub(Add(x, y), 1)),
+        (And(Geq(x, 0), Equal(Mod(x, 4), 1)), Add(Add(x, y), 3)),
+        (Or(Less(x, -4), Greater(x, 4)), Add(x, y)),
+        (Geq(x, 5), Add(x, y)),
+        (Or(Equal(Mod(x, 6), 0), Equal(Mod(x, 6), 3)), Add(x, Mult(2, y))),
+        (Leq(x, -1), Sub(x, y)),
+    ]
+    for cond, func in candidates:
+        coefficients, isAffine = getAffine(func.simplify())
+        start = time.perf_counter()
+        witness, decided = findLinearCounterexample(cond, *coefficients)
+        exactTime = time.perf_counter() - start
+        start = time.perf_counter()
+        heuristic = checkClosure(cond, func)
+        heuristicTime = time.perf_counter() - start
+        exact = "undecided" if not decided else witness is None
+        print("c(x) =", cond, ", f(x, y) =", func, ": exact =", exact,
+              "(witness " + str(witness) + ")" if witness is not None else "",
+              "in %.2f ms, checkClosure =" % (exactTime * 1000), heuristic,
+              "in %.2f ms" % (heuristicTime * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import io
+
+
+# String rendering of integer functions and boolean conditions.
+#
+# Each node describes its string representation by pieces(): a list of
+# strings and (child, wrapped) pairs, where wrapped is true if the child
+# should be wrapped in parentheses when its needsParens() is true.
+# The pieces are written iteratively to an io.StringIO, so rendering deep
+# trees neither recurses nor builds intermediate strings, and the result
+# is cached on the node (nodes are never modified after construction).
+
+
+# Returns the string representation of `node`.
+def render(node):
+    text = node.strCache
+    if text is None:
+        out = io.StringIO()
+        writeNode(out, node, False)
+        text = out.getvalue()
+        node.strCache = text
+    return text
+
+
+# Returns the string representation of `node`, wrapped in parentheses if
+# necessary. This allows string representations such as (x + y) * z.
+def renderWrapped(node):
+    if node.needsParens():
+        return "(" + render(node) + ")"
+    return render(node)
+
+
+# Writes the string representation of `node` to the stream `out`,
+# wrapped in parentheses if `wrapped` is true and the node needs them.
+def writeNode(out, node, wrapped):
+    stack = [(node, wrapped)]
+    while len(stack) > 0:
+        item = stack.pop()
+        if isinstance(item, str):
+            out.write(item)
+            continue
+        n, w = item
+        parens = w and n.needsParens()
+        text = n.strCache
+        if text is not None:
+            if parens:
+                out.write("(")
+                out.write(text)
+                out.write(")")
+            else:
+                out.write(text)
+            continue
+        if parens:
+            stack.append(")")
+        stack.extend(reversed(n.pieces()))
+        if parens:
+            stack.append("(")
+
+
+# A ValueError whose message is made of the given parts (strings and
+# nodes), which are only rendered if the message is actually displayed.
+class LazyError(ValueError):
+    def __init__(self, *parts):
+        super().__init__(*parts)
+        self.parts = parts
+
+    def __str__(self):
+        out = io.StringIO()
+        for part in self.parts:
+            out.write(str(part))
+        return out.getvalue()
@@ -0,0 +1,121 @@
+import asyncio
+
+from groups import *
+from limits import *
+
+# Extra time given to a worker, beyond the deadline of its check, to reach
+# a cancellation point and report its verdict before it is abandoned.
+DEADLINE_GRACE = 1.0
+
+
+# The verdict of a group check: `status` is GROUP, NOT_GROUP, or UNKNOWN,
+# and `reason` describes why the group is not a group or why the verdict
+# is unknown (e.g. "not closed" or "timed out").
+class CheckResult:
+    def __init__(self, status, reason="", identity=None, inverse=None):
+        self.status = status
+        self.reason = reason
+        self.identity = identity
+        self.inverse = inverse
+
+    def __str__(self):
+        if self.status == GROUP:
+            return self.status + " (identity = " + str(self.identity) + \
+                ", inverse(x) = " + str(self.inverse) + ")"
+        return self.status + " (" + self.reason + ")"
+
+
+# Checks whether cond(x) and func(x, y) form a group, stopping at the next
+# cancellation point once `token` expires or is cancelled, or as soon as
+# the check exceeds the budget of `token`.
+# Returns a CheckResult.
+def checkGroup(cond, func, token=None):
+    def run():
+        g = Group(cond, func)
+        result, reason = g.check()
+        if result:
+            return CheckResult(GROUP, "", g.identity, g.inverse)
+        elif result is None:
+            return CheckResult(UNKNOWN, reason)
+        return CheckResult(NOT_GROUP, reason)
+
+    try:
+        return runWithToken(token, run)
+    except CheckTimeout:
+        return CheckResult(UNKNOWN, "timed out")
+    except CheckCancelled:
+        return CheckResult(UNKNOWN, "cancelled")
+    except BudgetExceeded as e:
+        return CheckResult(UNKNOWN, "budget exceeded: " + str(e))
+    except RecursionError:
+        return CheckResult(UNKNOWN, "budget exceeded: recursion limit")
+    except LazyError as e:
+        # An axiom could not be decided (e.g. an expression that cannot be
+        # evaluated).
+        return CheckResult(UNKNOWN, str(e))
+    except Exception as e:
+        # Any other failure only affects this candidate.
+        return CheckResult(UNKNOWN, "error: " + type(e).__name__ + ": " + str(e))
+
+
+# Checks whether cond(x) and func(x, y) form a group on a worker of
+# `executor` (the event loop's default thread pool if None), giving up
+# after `timeout` seconds, or once the check exceeds `budget`, with an
+# UNKNOWN verdict.
+#
+# With a thread pool, cancelling the returned coroutine also cancels the
+# check at its next cancellation point. With a process pool, the check
+# cannot be reached once it has started, so it runs until its deadline.
+async def checkGroupAsync(cond, func, timeout=None, executor=None, budget=None):
+    loop = asyncio.get_running_loop()
+    token = CheckToken(timeout, budget)
+    future = loop.run_in_executor(executor, checkGroup, cond, func, token)
+    try:
+        if timeout is None:
+            return await future
+        return await asyncio.wait_for(asyncio.shield(future), timeout + DEADLINE_GRACE)
+    except asyncio.TimeoutError:
+        token.cancel()
+        return CheckResult(UNKNOWN, "timed out")
+    except asyncio.CancelledError:
+        token.cancel()
+        raise
+
+
+# Checks a list of (cond, func) candidates concurrently, each with its own
+# deadline and budget, so that a slow candidate does not hold up the others.
+# Returns the list of CheckResults in the same order as the candidates. A
+# candidate whose check fails with an exception (e.g. if it cannot be sent
+# to a process pool) gets an UNKNOWN verdict, without failing the others.
+# The caches of intermediate results are emptied once the batch is done
+# (see clearCaches).
+async def checkGroupsAsync(candidates, timeout=None, executor=None, budget=None):
+    checks = [checkGroupAsync(cond, func, timeout, executor, budget)
+              for cond, func in candidates]
+    try:
+        results = await asyncio.gather(*checks, return_exceptions=True)
+    finally:
+        clearCaches()
+    for i, result in enumerate(results):
+        if isinstance(result, asyncio.CancelledError):
+            raise result
+        if isinstance(result, BaseException):
+            results[i] = CheckResult(UNKNOWN, "error: " + type(result).__name__ + ": " + str(result))
+    return results
+
+
+def main():
+    print("\n\n\n------- MAIN ------")
+    candidates = [
+        (All(), Add(x, y)),
+        (Geq(x, 0), Add(x, y)),
+        (All(), Mult(Add(Add(x, y), 1), Add(Add(x, y), 2))),
+    ]
+    budget = Budget(maxNodes=200000, maxTerms=1000, maxDepth=500)
+    results = asyncio.run(checkGroupsAsync(candidates, 0.5, None, budget))
+    for (cond, func), result in zip(candidates, results):
+        print("c(x) =", cond, ", f(x, y) =", func, ":", result)
+
+
+if __name__ == "__main__":
+    main()
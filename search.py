@@ -0,0 +1,162 @@
+import random
+
+from membership import *
+from assoc import *
+
+
+# Numeric search for the identity and the inverses of an operation, for
+# operations that solving equations cannot handle (e.g. nonlinear ones, or
+# ones containing %).
+#
+# Candidates are proposed by evaluating the compiled operation on small
+# members of the set, and only the candidates that survive the numeric
+# tests are verified symbolically, so hopeless inputs are rejected after a
+# few evaluations.
+
+
+# Given a boolean expression `cond(x)` and an integer function `f(x, y)`,
+# searchIdentity returns (Num(e), True) if it finds a member e with
+# |e| <= SEARCH_LIMIT such that f(x, e) == f(e, x) == x for every member x.
+# It returns (Num(0), False) if every member is within the search limit and
+# is refuted by a sample, since then there is no identity. Otherwise, the
+# identity may be a larger member or one that could not be proven, so it
+# returns (Num(0), None).
+def searchIdentity(cond, func):
+    c = cond.simplify()
+    f = func.simplify()
+    op = compileOperation(f)
+    candidates = sorted(c.members(-SEARCH_LIMIT, SEARCH_LIMIT), key=abs)
+    samples = sampleMembers(candidates)
+    refuted = True
+    for e in candidates:
+        checkpoint()
+        if all(evalOperation(op, x, e) == x and evalOperation(op, e, x) == x
+               for x in samples):
+            if verifyIdentity(c, f, e):
+                return Num(e), True
+            refuted = False
+    if refuted and withinSearchLimit(c):
+        return Num(0), False
+    return Num(0), None
+
+
+# Given a boolean expression `cond(x)`, an integer function `f(x, y)`, and
+# its identity `identity`, searchInverse returns (g, True) if it finds an
+# affine function g(x) = ax + b such that, for every member x, g(x) is a
+# member and f(x, g(x)) == f(g(x), x) == identity. It returns
+# (Num(0), False) if every member is within the search limit and one of
+# them has no inverse. Otherwise, the inverse may be a larger member or not
+# be affine, so it returns (Num(0), None).
+#
+# The inverses of a few small members are found by searching the members
+# with |y| <= SEARCH_LIMIT, and g is fitted through them.
+def searchInverse(cond, func, identity):
+    c = cond.simplify()
+    f = func.simplify()
+    e = identity.value
+    op = compileOperation(f)
+    members = list(c.members(-SEARCH_LIMIT, SEARCH_LIMIT))
+    samples = sampleMembers([m for m in members if abs(m) <= SEARCH_LIMIT // 4])
+    if len(samples) < 2:
+        return Num(0), None
+
+    points = []
+    for x in samples:
+        checkpoint()
+        inverses = [y for y in members
+                    if evalOperation(op, x, y) == e and evalOperation(op, y, x) == e]
+        if len(inverses) == 0:
+            if withinSearchLimit(c):
+                return Num(0), False
+            return Num(0), None
+        points.append((x, inverses[0]))
+
+    (x1, y1), (x2, y2) = points[0], points[1]
+    if (y2 - y1) % (x2 - x1) != 0:
+        return Num(0), None
+    slope = (y2 - y1) // (x2 - x1)
+    offset = y1 - slope * x1
+    if any(y != slope * x + offset for x, y in points):
+        return Num(0), None
+    inverse = fromPolynomial(makePolynomial({("x",): slope, (): offset}))
+    if verifyInverse(c, f, inverse, identity) and checkClosure(c, inverse):
+        return inverse, True
+    return Num(0), None
+
+
+# Returns true if every member x of `cond` has |x| <= SEARCH_LIMIT, so that
+# the searches above see all of them.
+def withinSearchLimit(cond):
+    index = getMembership(cond)
+    if len(index.bottoms) == 0:
+        return True
+    return index.bottoms[0] >= -SEARCH_LIMIT and index.tops[-1] <= SEARCH_LIMIT
+
+
+# Returns true if f(x, e) and f(e, x) are provably equal to x for every
+# member x of `cond`.
+def verifyIdentity(cond, f, e):
+    ranges, bottoms, tops = getRanges(cond)
+    right = AssocTransform(X(), Num(e)).transform(f)
+    left = AssocTransform(Num(e), X()).transform(f)
+    return provesEqual(right, X(), ranges) and provesEqual(left, X(), ranges)
+
+
+# Returns true if f(x, g(x)) and f(g(x), x) are provably equal to the
+# identity for every member x of `cond`.
+def verifyInverse(cond, f, g, identity):
+    ranges, bottoms, tops = getRanges(cond)
+    right = AssocTransform(X(), g).transform(f)
+    left = AssocTransform(g, X()).transform(f)
+    return provesEqual(right, identity, ranges) and provesEqual(left, identity, ranges)
+
+
+# Returns true if the integer functions `expr(x)` and `target(x)` are
+# provably equal for every x in the given ranges, i.e. if they are equal as
+# polynomials once the redundant remainders have been removed (see
+# DropRedundantMods).
+def provesEqual(expr, target, ranges):
+    try:
+        reduced = DropRedundantMods(ranges).transform(expr).simplify()
+    except ValueError:
+        return False
+    poly, isPolynomial = toPolynomial(Sub(reduced, target))
+    if isPolynomial:
+        return len(poly) == 0
+    return reduced.compare(target) == 0
+
+
+# Returns up to SEARCH_SAMPLES members of the list `members`, chosen at
+# random.
+def sampleMembers(members):
+    rng = random.Random(SEARCH_SEED)
+    return rng.sample(members, min(len(members), SEARCH_SAMPLES))
+
+
+# Returns op(x, y), or None if it is undefined (e.g. x % 0).
+def evalOperation(op, x, y):
+    try:
+        return op(x, y)
+    except ZeroDivisionError:
+        return None
+
+
+# Replaces each `e % n`, where n is a positive constant and e is known to
+# be in [kn, kn + n - 1] for some integer k when x is in the given ranges,
+# with e - kn.
+class DropRedundantMods(TreeTransform):
+    def __init__(self, ranges):
+        super().__init__()
+        self.ranges = ranges
+
+    def transformMod(self, expr):
+        l = self.transform(expr.left)
+        r = self.transform(expr.right)
+        n, exists = r.eval()
+        if exists and n > 0:
+            allowed = inferAllowedRanges(l, self.ranges)
+            if len(allowed) > 0 and not isInfinite(allowed[0][0]) and not isInfinite(allowed[-1][1]):
+                k = allowed[0][0] // n
+                if allowed[-1][1] <= k * n + n - 1:
+                    return Sub(l, Num(k * n))
+        return Mod(l, r)
@@ -0,0 +1,161 @@
+from functions import *
+
+
+# Converts an integer function into a polynomial with integer coefficients.
+# The polynomial is represented as a map from monomials to coefficients,
+# where each monomial is a sorted tuple of variable names.
+# For example, 2ab + b - 3 is represented as
+# {("a", "b"): 2, ("b",): 1, (): -3}.
+# If `expr` only contains numbers, variables, +, -, and *, toPolynomial
+# returns (polynomial, True). Otherwise, it returns ({}, False).
+def toPolynomial(expr):
+    if isinstance(expr, Num):
+        if int(expr.value) != expr.value:
+            return {}, False
+        return makePolynomial({(): int(expr.value)}), True
+    elif expr.isVariable():
+        return {(expr.getVariableName(),): 1}, True
+    elif isinstance(expr, Minus):
+        child, childExists = toPolynomial(expr.child)
+        if not childExists:
+            return {}, False
+        return scalePolynomial(child, -1), True
+    elif isinstance(expr, Add) or isinstance(expr, Sub) or isinstance(expr, Mult):
+        l, lExists = toPolynomial(expr.left)
+        if not lExists:
+            return {}, False
+        r, rExists = toPolynomial(expr.right)
+        if not rExists:
+            return {}, False
+        if isinstance(expr, Add):
+            return addPolynomials(l, r), True
+        elif isinstance(expr, Sub):
+            return addPolynomials(l, scalePolynomial(r, -1)), True
+        else:
+            return multPolynomials(l, r), True
+    else:
+        return {}, False
+
+
+# Converts a polynomial (as returned by toPolynomial) back into a simplified
+# integer function.
+def fromPolynomial(poly):
+    terms = []
+    for monomial in sorted(poly.keys(), key=lambda m: (-len(m), m)):
+        coefficient = poly[monomial]
+        if len(monomial) == 0:
+            terms.append(Num(coefficient))
+            continue
+        term = variableFromName(monomial[0])
+        for name in monomial[1:]:
+            term = Mult(term, variableFromName(name))
+        if coefficient == -1:
+            term = Minus(term)
+        elif coefficient != 1:
+            term = Mult(Num(coefficient), term)
+        terms.append(term)
+    if len(terms) == 0:
+        return Num(0)
+    result = terms[0]
+    for term in terms[1:]:
+        result = Add(result, term)
+    return result.simplify()
+
+
+# Given two integer functions `lhs` and `rhs` and a variable `target`
+# (A, B, C, X, or Y), solveFor isolates `target` in the equation lhs == rhs.
+# The equation must be linear in `target`, i.e. of the form
+# p * target + q == 0, where p and q are polynomials in the other variables.
+# The solution target == -q / p is returned as (solution, True) if it is
+# guaranteed to be an integer, which is the case if:
+# 1. p is a nonzero constant that divides every coefficient of q, or:
+# 2. q is an integer multiple k * p of p, in which case target == -k.
+# For example, solving a + b == 0 for b returns (-a, True), and solving
+# ab == a for b returns (1, True).
+# Otherwise, solveFor returns (Num(0), False).
+def solveFor(lhs, rhs, target):
+    l, lExists = toPolynomial(lhs)
+    if not lExists:
+        return Num(0), False
+    r, rExists = toPolynomial(rhs)
+    if not rExists:
+        return Num(0), False
+    poly = addPolynomials(l, scalePolynomial(r, -1))
+
+    # Split the polynomial into p * target + q
+    name = target.getVariableName()
+    p = {}
+    q = {}
+    for monomial, coefficient in poly.items():
+        degree = monomial.count(name)
+        if degree == 0:
+            q[monomial] = coefficient
+        elif degree == 1:
+            rest = list(monomial)
+            rest.remove(name)
+            p[tuple(rest)] = coefficient
+        else:
+            return Num(0), False
+    if len(p) == 0:
+        return Num(0), False
+
+    # p is a nonzero constant: target == -q / p if p divides q
+    if len(p) == 1 and () in p:
+        divisor = p[()]
+        solution = {}
+        for monomial, coefficient in q.items():
+            if coefficient % divisor != 0:
+                return Num(0), False
+            solution[monomial] = -(coefficient // divisor)
+        return fromPolynomial(solution), True
+
+    # p is not constant: target == -k if q == k * p
+    if len(q) == 0:
+        return Num(0), True
+    monomial = next(iter(p))
+    if monomial not in q or q[monomial] % p[monomial] != 0:
+        return Num(0), False
+    k = q[monomial] // p[monomial]
+    if q != scalePolynomial(p, k):
+        return Num(0), False
+    return Num(-k), True
+
+
+###### Polynomial arithmetic helpers ######
+
+
+# Returns the variable expression (A, B, C, X, Y, or K) with the given name.
+def variableFromName(name):
+    variables = {"a": A, "b": B, "c": C, "x": X, "y": Y, "k": K}
+    if name not in variables:
+        raise ValueError("!!! Unknown variable name " + name + " !!!")
+    return variables[name]()
+
+
+# Returns a copy of the polynomial `poly` without any zero coefficients.
+def makePolynomial(poly):
+    return {m: coefficient for m, coefficient in poly.items() if coefficient != 0}
+
+
+# Returns the sum of the polynomials l and r.
+def addPolynomials(l, r):
+    result = dict(l)
+    for monomial, coefficient in r.items():
+        result[monomial] = result.get(monomial, 0) + coefficient
+    return makePolynomial(result)
+
+
+# Returns the product of the polynomial `poly` and the integer `factor`.
+def scalePolynomial(poly, factor):
+    return makePolynomial({m: coefficient * factor for m, coefficient in poly.items()})
+
+
+# Returns the product of the polynomials l and r.
+def multPolynomials(l, r):
+    result = {}
+    for lMonomial, lCoefficient in l.items():
+        for rMonomial, rCoefficient in r.items():
+            monomial = tuple(sorted(lMonomial + rMonomial))
+            result[monomial] = result.get(monomial, 0) + \
+                lCoefficient * rCoefficient
+    return makePolynomial(result)
@@ -0,0 +1,60 @@
+from treetransform import *
+from cache import *
+
+# Commutativity only depends on the operation, so results are cached by the
+# key of the operation.
+commutativeCache = Cache("commutativity")
+
+
+# Given an integer function f(x, y), isCommutative returns true if
+# f(x, y) == f(y, x) can be shown by comparing f with itself with x and y
+# swapped (see isMirror). It may return false for commutative operations
+# that are not recognized this way, so callers only use it to skip work.
+#
+# For a commutative operation, a table of f(i, j) only needs the pairs with
+# i <= j, and f is associative on (a, b, c) if and only if it is on
+# (c, b, a), since f(f(a, b), c) == f(c, f(b, a)).
+def isCommutative(func):
+    result, cached = commutativeCache.get(func.key())
+    if cached:
+        return result
+    # func is compared as given (callers pass the simplified operation that
+    # they evaluate), since simplifying again may give another expression.
+    return commutativeCache.put(func.key(), isMirror(func, func))
+
+
+# Returns true if l(x, y) == r(y, x) for the integer functions l and r:
+# either both are polynomials and the polynomial of l is the polynomial of
+# r with x and y swapped, or they have the same operator and children for
+# which isMirror is true (in either order for + and *). Neither
+# Math.compare (which does not compare every child, e.g. of Minus) nor
+# simplifying r(y, x) is relied upon.
+def isMirror(l, r):
+    lPoly, lIsPolynomial = toPolynomial(l)
+    rPoly, rIsPolynomial = toPolynomial(r)
+    if lIsPolynomial and rIsPolynomial:
+        return lPoly == swapPolynomial(rPoly)
+    if isinstance(l, X):
+        return isinstance(r, Y)
+    elif isinstance(l, Y):
+        return isinstance(r, X)
+    elif type(l) != type(r):
+        return False
+    elif isinstance(l, Minus):
+        return isMirror(l.child, r.child)
+    elif isinstance(l, BinaryMath):
+        if isMirror(l.left, r.left) and isMirror(l.right, r.right):
+            return True
+        return (isinstance(l, Add) or isinstance(l, Mult)) and \
+            isMirror(l.left, r.right) and isMirror(l.right, r.left)
+    return l.key() == r.key()
+
+
+# Returns the polynomial `poly` with the variables x and y swapped.
+def swapPolynomial(poly):
+    names = {"x": "y", "y": "x"}
+    result = {}
+    for monomial, coefficient in poly.items():
+        swapped = tuple(sorted(names.get(name, name) for name in monomial))
+        result[swapped] = coefficient
+    return result
@@ -0,0 +1,71 @@
+from closure import *
+from finite import *
+from solver import *
+
+
+# Transport of structure: an operation f(x, y) is conjugate to an operation
+# ∘ under a bijection φ of the integers if f(x, y) == φ⁻¹(φ(x) ∘ φ(y)).
+# Then (S, f) is a group if and only if (φ(S), ∘) is a group, so the
+# verdict for f follows from the known groups of ∘.
+#
+# The bijections considered are φ(x) = px + q with p == 1 or p == -1, so
+# that φ⁻¹(z) == p(z - q). For them:
+# 1. f is conjugate to + if and only if f(x, y) == x + y + pq, which is an
+#    affine operation (see affine.py), and:
+# 2. f is conjugate to * if and only if
+#    f(x, y) == pxy + qx + qy + p(q² - q).
+#    For example, x + y + xy == (x + 1)(y + 1) - 1 is conjugate to * with
+#    φ(x) = x + 1.
+# A set of integers T is a group under * if and only if T == {1} or
+# T == {-1, 1} (or T == {0}), so (S, f) is a group if and only if
+# φ(S) is one of these sets.
+
+
+# If the integer function `f(x, y)` is conjugate to * under φ(x) = px + q,
+# getMultTransport returns ((p, q), True). Otherwise, it returns
+# ((0, 0), False).
+def getMultTransport(f):
+    poly, isPolynomial = toPolynomial(f)
+    if not isPolynomial:
+        return (0, 0), False
+    for monomial in poly:
+        if monomial not in [(), ("x",), ("y",), ("x", "y")]:
+            return (0, 0), False
+    p = poly.get(("x", "y"), 0)
+    q = poly.get(("x",), 0)
+    if p not in [-1, 1] or poly.get(("y",), 0) != q or poly.get((), 0) != p * (q * q - q):
+        return (0, 0), False
+    return (p, q), True
+
+
+# Returns φ⁻¹(z) for φ(x) = px + q.
+def transportBack(p, q, z):
+    return p * (z - q)
+
+
+# Given a boolean expression `cond(x)` and an operation `func` conjugate to
+# * under φ(x) = px + q, decides the group axioms as Group.check does.
+# Returns (True, "", identity, inverse) if this is a group, or
+# (False, reason, identity, inverse) otherwise.
+def checkMultTransport(cond, func, p, q):
+    members, isFinite = None, False
+    if hasNumpy():
+        members, isFinite = getFiniteMembers(cond)
+    if isFinite:
+        image = set(p * int(m) + q for m in members)
+        for i in image:
+            for j in image:
+                if i * j not in image:
+                    return False, "not closed", None, None
+    elif not checkClosure(cond, func):
+        return False, "not closed", None, None
+    # * is associative, and so is every operation conjugate to it.
+    if isFinite and image == set([0]):
+        return True, "", Num(transportBack(p, q, 0)), X()
+    identity = transportBack(p, q, 1)
+    if not cond.contains(identity):
+        return False, "no identity element", Num(0), None
+    # Only 1 and -1 have inverses under *, and both are their own inverse.
+    if not isFinite or not image.issubset(set([-1, 1])):
+        return False, "no inverse", Num(identity), Num(0)
+    return True, "", Num(identity), X()
@@ -9,6 +9,7 @@ class TreeTransform:
     def __init__(self):
         pass
 
+    @limited
     def transform(self, expr):
         if isinstance(expr, All):
             return self.transformAll(expr)
@@ -48,6 +49,8 @@ class TreeTransform:
             return self.transformX(expr)
         elif isinstance(expr, Y):
             return self.transformY(expr)
+        elif isinstance(expr, K):
+            return self.transformK(expr)
         elif isinstance(expr, Num):
             return self.transformNum(expr)
         else:
@@ -133,8 +136,13 @@ class TreeTransform:
     def transformY(self, expr):
         return Y()
 
+    def transformK(self, expr):
+        return K()
+
+    # Nodes are never modified after construction, so numbers (like the
+    # shared variable instances) can be reused rather than copied.
     def transformNum(self, expr):
-        return Num(expr.value)
+        return expr
 
 
 # Replace occurrences of x and y in an integer function f(x, y) with the
@@ -0,0 +1,66 @@
+from conditions import *
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Returns true if NumPy is available for vectorized evaluation.
+def hasNumpy():
+    return np is not None
+
+
+# Given an integer function `expr` and two NumPy arrays `xs` and `ys` of the
+# same shape, evalArray returns the array of values expr(xs[i], ys[i]).
+# Values are computed with the same semantics as Math.eval and have the
+# dtype of `xs`, so arrays of dtype=object can be passed in to evaluate
+# without integer overflow.
+def evalArray(expr, xs, ys):
+    if isinstance(expr, X):
+        return xs
+    elif isinstance(expr, Y):
+        return ys
+    elif isinstance(expr, Num):
+        result = np.empty(np.shape(xs), dtype=np.asarray(xs).dtype)
+        result.fill(expr.value)
+        return result
+    elif isinstance(expr, Minus):
+        return -evalArray(expr.child, xs, ys)
+    elif isinstance(expr, BinaryMath):
+        l = evalArray(expr.left, xs, ys)
+        r = evalArray(expr.right, xs, ys)
+        return expr.func(l, r)
+    else:
+        raise ValueError("!!! Cannot evaluate " + str(expr) +
+                         " on arrays of integers !!!")
+
+
+# Given a boolean expression `cond(x)` and a NumPy array `xs`,
+# evalConditionArray returns the boolean array of values cond(xs[i]).
+def evalConditionArray(cond, xs):
+    if isinstance(cond, All):
+        return np.ones(np.shape(xs), dtype=bool)
+    elif isinstance(cond, Empty):
+        return np.zeros(np.shape(xs), dtype=bool)
+    elif isinstance(cond, And):
+        return evalConditionArray(cond.left, xs) & evalConditionArray(cond.right, xs)
+    elif isinstance(cond, Or):
+        return evalConditionArray(cond.left, xs) | evalConditionArray(cond.right, xs)
+    elif isinstance(cond, BinaryCondition):
+        l = evalArray(cond.left, xs, xs)
+        r = evalArray(cond.right, xs, xs)
+        if isinstance(cond, Equal):
+            result = l == r
+        elif isinstance(cond, Greater):
+            result = l > r
+        elif isinstance(cond, Geq):
+            result = l >= r
+        elif isinstance(cond, Less):
+            result = l < r
+        else:
+            result = l <= r
+        return np.asarray(result, dtype=bool)
+    else:
+        raise ValueError("!!! Cannot evaluate " + str(cond) +
+                         " on arrays of integers !!!")